@@ -1,3 +1,181 @@
-from django.test import TestCase
+import os
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+import orjson
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from django.test import SimpleTestCase
+
+import log_storage
+from agent_api.views import _join_capped, _resume_preview_parts, _summary_preview_parts
+from log_storage import EncryptedLogStore, LogEntry
+
+
+def _entry(n: int) -> LogEntry:
+    return LogEntry("2024-01-01T00:00:00Z", f"event{n}", {"n": n}, f"preview {n}")
+
+
+class EncryptedLogStoreTests(SimpleTestCase):
+    password = "secret"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "logs.enc"
+
+    def _store_with(self, count: int) -> EncryptedLogStore:
+        store = EncryptedLogStore(self.path)
+        for n in range(count):
+            store.append_log(_entry(n), self.password)
+        return store
+
+    def _event_types(self, store: EncryptedLogStore) -> list:
+        return [e.event_type for e in store.load_logs(self.password)]
+
+    def _delete(self, store: EncryptedLogStore, *positions: int) -> None:
+        """Delete the entries at `positions` in the currently loaded log."""
+        entries = store.load_logs(self.password)
+        for pos in positions:
+            store.delete_log(entries[pos].entry_id, self.password)
+
+    def test_append_after_truncated_frame(self):
+        self._store_with(3)
+        blob = self.path.read_bytes()
+        self.path.write_bytes(blob[:-5])
+
+        store = EncryptedLogStore(self.path)
+        self.assertEqual(self._event_types(store), ["event0", "event1"])
+        store.append_log(_entry(3), self.password)
+
+        # A fresh store has no cached frame offsets and must rescan too
+        fresh = EncryptedLogStore(self.path)
+        fresh.append_log(_entry(4), self.password)
+        self.assertEqual(
+            self._event_types(EncryptedLogStore(self.path)),
+            ["event0", "event1", "event3", "event4"],
+        )
+
+    def test_tombstones_replay_in_order(self):
+        store = self._store_with(10)
+        self._delete(store, 0, 4)
+        self.assertEqual(
+            self._event_types(EncryptedLogStore(self.path)),
+            ["event1", "event2", "event3", "event5", "event6", "event7", "event8", "event9"],
+        )
+
+    def test_unknown_id_tombstone_is_ignored(self):
+        store = self._store_with(10)
+        store.delete_log("no-such-entry", self.password)
+        self.assertEqual(len(EncryptedLogStore(self.path).load_logs(self.password)), 10)
+
+    def test_compaction_keeps_entries(self):
+        store = self._store_with(4)
+        self._delete(store, 1, 2)
+        # Two tombstones out of six frames exceed COMPACT_RATIO: rewritten
+        self.assertEqual(store._frame_stats, (2, 0))
+        self.assertEqual(
+            self._event_types(EncryptedLogStore(self.path)), ["event0", "event3"]
+        )
+
+    def test_wrong_password_rejected(self):
+        store = self._store_with(1)
+        with self.assertRaises(ValueError):
+            store.load_logs("wrong")
+        with self.assertRaises(ValueError):
+            store.append_log(_entry(1), "wrong")
+
+    def test_cipher_cache_keeps_only_verified_keys(self):
+        store = self._store_with(1)
+        for n in range(log_storage.AEAD_CACHE_SIZE + 2):
+            with self.assertRaises(ValueError):
+                store.load_logs(f"wrong{n}")
+        self.assertEqual(len(store._aead_cache), 1)
+        self.assertEqual(self._event_types(store), ["event0"])
+
+    def test_empty_log_still_checks_password(self):
+        store = self._store_with(4)
+        self._delete(store, 0, 1, 2, 3)
+        self.assertEqual(EncryptedLogStore(self.path).load_logs(self.password), [])
+        with self.assertRaises(ValueError):
+            EncryptedLogStore(self.path).load_logs("wrong")
+        with self.assertRaises(ValueError):
+            EncryptedLogStore(self.path).append_log(_entry(9), "wrong")
+        self.assertEqual(EncryptedLogStore(self.path).load_logs(self.password), [])
+
+    def test_delete_by_id_with_two_writers(self):
+        self._store_with(3)
+        api, desktop = EncryptedLogStore(self.path), EncryptedLogStore(self.path)
+        stale = api.load_logs(self.password)
+        # The other writer removes the first entry after `stale` was read
+        self._delete(desktop, 0)
+        api.delete_log(stale[2].entry_id, self.password)
+        self.assertEqual(self._event_types(EncryptedLogStore(self.path)), ["event1"])
+
+    def test_entry_ids_survive_compaction(self):
+        store = self._store_with(3)
+        ids = [e.entry_id for e in store.load_logs(self.password)]
+        store.save_logs(store.load_logs(self.password), self.password)
+        reloaded = [e.entry_id for e in EncryptedLogStore(self.path).load_logs(self.password)]
+        self.assertEqual(reloaded, ids)
+
+    def test_unlocked_key_stands_in_for_password(self):
+        store = EncryptedLogStore(self.path)
+        key = store.unlock(self.password)
+        self.assertTrue(self.path.exists())
+        store.append_log(_entry(0), key)
+        self._delete(store, 0)
+        store.append_log(_entry(1), key)
+        self.assertEqual([e.event_type for e in store.load_logs(key)], ["event1"])
+        self.assertEqual(self._event_types(EncryptedLogStore(self.path)), ["event1"])
+        with self.assertRaises(ValueError):
+            store.unlock("wrong")
+
+        # A key for a file that has since been replaced is rejected
+        self.path.unlink()
+        EncryptedLogStore(self.path).append_log(_entry(2), self.password)
+        with self.assertRaises(ValueError):
+            store.load_logs(key)
+
+    def test_previous_frame_format_is_upgraded(self):
+        salt = os.urandom(16)
+        header = b"LALOG2" + salt
+        aead = AESGCM(log_storage._derive_key(self.password, salt))
+        blob = header
+        for record in (_entry(0).to_dict(), _entry(1).to_dict(), {"deleted": 0}):
+            nonce = os.urandom(12)
+            body = nonce + aead.encrypt(nonce, orjson.dumps(record), header)
+            blob += len(body).to_bytes(4, "big") + body
+        self.path.write_bytes(blob)
+
+        self.assertEqual(self._event_types(EncryptedLogStore(self.path)), ["event1"])
+        self.assertTrue(self.path.read_bytes().startswith(b"LALOG3"))
+        self.assertEqual(self._event_types(EncryptedLogStore(self.path)), ["event1"])
+        with self.assertRaises(ValueError):
+            EncryptedLogStore(self.path).load_logs("wrong")
+
+    def test_rewrite_leaves_no_temp_files(self):
+        store = self._store_with(3)
+        store.save_logs(store.load_logs(self.password), self.password)
+        self.assertEqual([p.name for p in self.path.parent.iterdir()], [self.path.name])
+
+
+class LogPreviewTests(SimpleTestCase):
+    def test_resume_preview_matches_plain_join(self):
+        for bullets in ([], ["one"], ["one", "two", "three"]):
+            expected = (
+                "PROFILE:\n"
+                + "p"
+                + "\n\nBULLETS:\n"
+                + "\n".join(f"- {b}" for b in bullets)
+                + "\n\nCOVER LETTER:\n"
+                + "c"
+            )
+            for limit in (3000, 15):
+                parts = _resume_preview_parts("p", bullets, "c")
+                self.assertEqual(_join_capped(parts, limit), expected[:limit])
+
+    def test_summary_preview_matches_plain_join(self):
+        for results in ([], [{"subject": "s0", "summary_raw": "a"}],
+                        [{"subject": "s0", "summary_raw": "a"}, {"subject": "s1", "summary_raw": "b"}]):
+            expected = "\n\n".join(f"Subject: {r['subject']}\n{r['summary_raw']}" for r in results)
+            self.assertEqual(_join_capped(_summary_preview_parts(results), 2000), expected)
@@ -2,80 +2,259 @@
 # from django.shortcuts import render
 from __future__ import annotations
 
-import json
+import functools
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
-from django.http import JsonResponse, HttpRequest
+import orjson
+from django.http import HttpRequest, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 
 from email_fetcher import fetch_recent_messages
-from llm_client import LLMClient
-from prompts import EMAIL_SUMMARY_PROMPT, RESUME_TAILOR_PROMPT
-from log_storage import EncryptedLogStore
+from llm_client import LLMClient, LLMError
+from prompts import email_summary_prompt, resume_tailor_prompt
+from log_storage import EncryptedLogStore, LogKey
 from log_storage import LogEntry  # import dataclass
 
-# Simple in-process password state (works for `runserver` single process)
-LOG_PASSWORD: str | None = None
+JSON_CONTENT_TYPE = "application/json"
+
+# Unlocked log sessions: cookie value -> (LogKey, expires_at monotonic time).
+# Only the derived key is kept, never the password. Each browser session
+# carries its own cookie, so concurrent requests don't share a single key. This is per process; running several
+# worker processes would need a shared store.
+LOG_SESSION_COOKIE = "logs_sess"
+LOG_SESSION_TTL = 8 * 60 * 60  # seconds
+_LOG_SESSIONS: Dict[str, Tuple[LogKey, float]] = {}
+# Request threads read, insert and sweep _LOG_SESSIONS concurrently
+_LOG_SESSIONS_LOCK = threading.Lock()
+
 LOG_STORE = EncryptedLogStore()
 
+# Decrypted entries cached against the log file's (mtime, size) stamp, so
+# read-only requests don't pay for a full decrypt when nothing changed.
+_LOG_CACHE: List[LogEntry] | None = None
+_LOG_STAMP: tuple[int, int] | None = None
+# Bumped on every in-memory change that isn't visible in the file stamp yet
+_LOG_VERSION = 0
+_LOG_LOCK = threading.Lock()
+
+# Encrypted writes run on a single background worker, so they reach the
+# file in submission order and responses don't wait on encryption.
+_LOG_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-writer")
+
 
 def _json_body(request: HttpRequest) -> Dict[str, Any]:
+    body = request.body
+    if not body:
+        return {}
     try:
-        return json.loads(request.body.decode("utf-8") or "{}")
-    except Exception:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
         return {}
 
 
-def _parse_iso(ts: str) -> datetime | None:
+def _json_response(payload: Dict[str, Any], status: int = 200) -> HttpResponse:
+    """
+    Serialize `payload` with orjson into a plain HttpResponse. This skips
+    JsonResponse's encoder instance and `safe` check on every response.
+    """
+    return HttpResponse(orjson.dumps(payload), status=status, content_type=JSON_CONTENT_TYPE)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client() -> LLMClient:
+    """Shared LLMClient, so its connection pool and response cache outlive requests."""
+    return LLMClient()
+
+
+def _log_key(request: HttpRequest) -> LogKey | None:
+    """Return the log key for this request's unlocked session, if any."""
+    sid = request.COOKIES.get(LOG_SESSION_COOKIE)
+    if not sid:
+        return None
+    with _LOG_SESSIONS_LOCK:
+        session = _LOG_SESSIONS.get(sid)
+        if session is None:
+            return None
+        key, expires_at = session
+        if expires_at < time.monotonic():
+            _LOG_SESSIONS.pop(sid, None)
+            return None
+    return key
+
+
+def _log_file_stamp() -> tuple[int, int] | None:
+    try:
+        st = LOG_STORE.path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _get_entries(key: LogKey) -> List[LogEntry]:
+    """
+    Return the decrypted log entries, reusing the cached list while the
+    log file on disk is unchanged. Callers must not mutate the result.
+    """
+    global _LOG_CACHE, _LOG_STAMP
+    with _LOG_LOCK:
+        stamp = _log_file_stamp()
+        if _LOG_CACHE is not None and stamp == _LOG_STAMP:
+            return _LOG_CACHE
+        entries = LOG_STORE.load_logs(key)
+        _LOG_CACHE, _LOG_STAMP = entries, stamp
+        return entries
+
+
+def _invalidate_log_cache() -> None:
+    global _LOG_CACHE, _LOG_STAMP, _LOG_VERSION
+    with _LOG_LOCK:
+        _LOG_CACHE, _LOG_STAMP = None, None
+        _LOG_VERSION += 1
+
+
+def _write_entry(entry: LogEntry, key: LogKey, cache: List[LogEntry] | None) -> None:
+    global _LOG_STAMP
+    try:
+        LOG_STORE.append_log(entry, key)
+    except (OSError, ValueError):
+        # Don't fail the API if logging fails; drop the optimistic cache entry
+        _invalidate_log_cache()
+        return
+    with _LOG_LOCK:
+        if cache is not None and _LOG_CACHE is cache:
+            _LOG_STAMP = _log_file_stamp()
+
+
+def _append_entry(entry: LogEntry, key: LogKey) -> None:
+    """
+    Add `entry` to the cached log list right away and encrypt it to disk
+    on the background writer, so a follow-up list_logs needs no decrypt.
+    """
+    global _LOG_CACHE, _LOG_STAMP, _LOG_VERSION
+    with _LOG_LOCK:
+        _LOG_VERSION += 1
+        cache = _LOG_CACHE
+        if cache is not None and _log_file_stamp() == _LOG_STAMP:
+            cache.append(entry)
+        else:
+            cache = _LOG_CACHE = _LOG_STAMP = None
+    _LOG_WRITER.submit(_write_entry, entry, key, cache)
+
+
+def _wait_for_log_writes() -> None:
+    """Block until every queued background log write has finished."""
+    _LOG_WRITER.submit(lambda: None).result()
+
+
+def _parse_iso_date(ts: str) -> date | None:
+    """
+    Return the date part of an ISO timestamp like 'YYYY-MM-DDTHH:MM:SSZ'.
+
+    Filtering only needs the date, so the common case slices the first ten
+    characters and skips parsing the time component entirely.
+    """
+    if len(ts) >= 10 and (len(ts) == 10 or ts[10] == "T"):
+        try:
+            return date.fromisoformat(ts[:10])
+        except ValueError:
+            return None
     if not ts:
         return None
     try:
         if ts.endswith("Z"):
             ts = ts[:-1]
-        return datetime.fromisoformat(ts)
-    except Exception:
+        return datetime.fromisoformat(ts).date()
+    except ValueError:
         return None
 
 
-def _serialize_log(entries: List[LogEntry]) -> List[Dict[str, Any]]:
-    """Attach an index id to each log entry for deletion."""
-    out: List[Dict[str, Any]] = []
-    for idx, e in enumerate(entries):
-        out.append(
-            {
-                "id": idx,
-                "timestamp": e.timestamp,
-                "event_type": e.event_type,
-                "meta": e.meta,
-                "preview": e.preview,
-            }
-        )
-    return out
+def _serialize_log(entries: Iterable[LogEntry]) -> List[Dict[str, Any]]:
+    """
+    Serialize log entries with their stable id, which delete_log takes.
+    `meta` is passed through, not copied.
+    """
+    return [
+        {
+            "id": e.entry_id,
+            "timestamp": e.timestamp,
+            "event_type": e.event_type,
+            "meta": e.meta,
+            "preview": e.preview,
+        }
+        for e in entries
+    ]
+
+
+def _join_capped(parts: Iterable[str], limit: int) -> str:
+    """
+    Equivalent to "".join(parts)[:limit], but stops consuming `parts` once
+    `limit` characters are collected instead of building the full string.
+    """
+    out: List[str] = []
+    remaining = limit
+    for part in parts:
+        part = part[:remaining]
+        out.append(part)
+        remaining -= len(part)
+        if remaining <= 0:
+            break
+    return "".join(out)
+
+
+def _summary_preview_parts(results: List[Dict[str, Any]]) -> Iterator[str]:
+    """Yield the email-summary log preview piece by piece, without concatenating."""
+    sep = ""
+    for r in results:
+        yield sep
+        yield "Subject: "
+        yield r["subject"]
+        yield "\n"
+        yield r["summary_raw"]
+        sep = "\n\n"
+
+
+def _resume_preview_parts(profile: str, bullets: List[Any], cover_letter: str) -> Iterator[str]:
+    """Yield the resume-tailor log preview piece by piece, without concatenating."""
+    yield "PROFILE:\n"
+    yield profile
+    yield "\n\nBULLETS:\n"
+    sep = ""
+    for b in bullets:
+        yield sep
+        yield f"- {b}"
+        sep = "\n"
+    yield "\n\nCOVER LETTER:\n"
+    yield cover_letter
 
 
 @csrf_exempt
-def summarize_emails(request: HttpRequest) -> JsonResponse:
+def summarize_emails(request: HttpRequest) -> HttpResponse:
     if request.method != "POST":
-        return JsonResponse({"detail": "POST required"}, status=405)
+        return _json_response({"detail": "POST required"}, status=405)
 
     data = _json_body(request)
     count = int(data.get("count", 3))
+    query = data.get("query") or None  # optional Gmail search, e.g. "is:unread"
 
     try:
-        messages = fetch_recent_messages(count)
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        messages = fetch_recent_messages(count, query=query)
+    except Exception as e:  # auth, network and Gmail API errors all end up here
+        return _json_response({"error": str(e)}, status=500)
 
-    client = LLMClient()
+    client = _get_client()
+    prompts = [email_summary_prompt(m.get("snippet", "")) for m in messages]
+    summaries = client.generate_many(prompts, max_tokens=256, task_type="email")
     results = []
 
-    for m in messages:
-        prompt = EMAIL_SUMMARY_PROMPT.format(email=m.get("snippet", ""))
-        try:
-            summary_text = client.generate(prompt, max_tokens=256, task_type="email")
-        except Exception as e:
-            summary_text = f"[Error generating summary: {e}]"
+    for m, summary_text in zip(messages, summaries):
+        if isinstance(summary_text, LLMError):
+            summary_text = f"[Error generating summary: {summary_text}]"
         results.append(
             {
                 "subject": m.get("subject", ""),
@@ -84,59 +263,54 @@ def summarize_emails(request: HttpRequest) -> JsonResponse:
             }
         )
 
-    # Append to logs if password set
-    global LOG_PASSWORD
-    if LOG_PASSWORD:
-        combined = "\n\n".join(
-            f"Subject: {r['subject']}\n{r['summary_raw']}" for r in results
-        )
+    # Append to logs if unlocked
+    key = _log_key(request)
+    if key is not None:
+        combined = _join_capped(_summary_preview_parts(results), 2000)
         entry = LOG_STORE.create_entry(
             event_type="email_summary",
             meta={"count": len(results)},
-            preview=combined[:2000],
+            preview=combined,
         )
-        try:
-            LOG_STORE.append_log(entry, LOG_PASSWORD)
-        except Exception:
-            # Don't fail the API if logging fails
-            pass
+        _append_entry(entry, key)
 
-    return JsonResponse({"results": results})
+    return _json_response({"results": results})
 
 
 @csrf_exempt
-def tailor_resume(request: HttpRequest) -> JsonResponse:
+def tailor_resume(request: HttpRequest) -> HttpResponse:
     if request.method != "POST":
-        return JsonResponse({"detail": "POST required"}, status=405)
+        return _json_response({"detail": "POST required"}, status=405)
 
     data = _json_body(request)
     job_text = (data.get("job_text") or "").strip()
     resume_text = (data.get("resume_text") or "").strip()
 
     if not job_text or not resume_text:
-        return JsonResponse(
+        return _json_response(
             {"error": "job_text and resume_text are required"},
             status=400,
         )
 
-    client = LLMClient()
-    prompt = RESUME_TAILOR_PROMPT.format(job_text=job_text, resume_text=resume_text)
+    client = _get_client()
+    prompt = resume_tailor_prompt(job_text, resume_text)
 
     try:
         raw_output = client.generate(
             prompt,
             max_tokens=1024,
-            temperature=0.4,
+            temperature=0.0,
             task_type="resume",
+            response_format={"type": "json_object"},
         )
-    except Exception as e:
-        return JsonResponse({"error": f"LLM call failed: {e}"}, status=500)
+    except LLMError as e:
+        return _json_response({"error": f"LLM call failed: {e}"}, status=500)
 
     try:
-        data_out = json.loads(raw_output)
-    except json.JSONDecodeError:
+        data_out = orjson.loads(raw_output)
+    except orjson.JSONDecodeError:
         # Return raw output so frontend can show + allow manual salvage
-        return JsonResponse(
+        return _json_response(
             {"error": "Could not parse JSON from model", "raw_output": raw_output},
             status=502,
         )
@@ -145,28 +319,18 @@ def tailor_resume(request: HttpRequest) -> JsonResponse:
     bullets = data_out.get("bullets", []) or []
     cover_letter = data_out.get("cover_letter", "")
 
-    # Log event if password set
-    global LOG_PASSWORD
-    if LOG_PASSWORD:
-        preview = (
-            "PROFILE:\n"
-            + profile
-            + "\n\nBULLETS:\n"
-            + "\n".join(f"- {b}" for b in bullets)
-            + "\n\nCOVER LETTER:\n"
-            + cover_letter
-        )
+    # Log event if unlocked
+    key = _log_key(request)
+    if key is not None:
+        preview = _join_capped(_resume_preview_parts(profile, bullets, cover_letter), 3000)
         entry = LOG_STORE.create_entry(
             event_type="resume_tailor",
             meta={"bullet_count": len(bullets)},
-            preview=preview[:3000],
+            preview=preview,
         )
-        try:
-            LOG_STORE.append_log(entry, LOG_PASSWORD)
-        except Exception:
-            pass
+        _append_entry(entry, key)
 
-    return JsonResponse(
+    return _json_response(
         {
             "profile": profile,
             "bullets": bullets,
@@ -176,132 +340,167 @@ def tailor_resume(request: HttpRequest) -> JsonResponse:
 
 
 @csrf_exempt
-def unlock_logs(request: HttpRequest) -> JsonResponse:
+def unlock_logs(request: HttpRequest) -> HttpResponse:
     """
     POST { "password": "..." }
 
     - If log file exists, tries to decrypt with given password.
-    - If success: stores password in memory and returns all logs.
+    - If success: stores the derived key (not the password) in memory
+      under a new session cookie and returns all logs.
     - If file does not exist: initializes empty logs with that password.
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "POST required"}, status=405)
+        return _json_response({"detail": "POST required"}, status=405)
 
     data = _json_body(request)
     password = data.get("password") or ""
     if not password:
-        return JsonResponse({"error": "password is required"}, status=400)
+        return _json_response({"error": "password is required"}, status=400)
 
+    _wait_for_log_writes()
+    _invalidate_log_cache()
     try:
-        entries = LOG_STORE.load_logs(password)
+        key = LOG_STORE.unlock(password)
+        entries = _get_entries(key)
     except ValueError:
-        return JsonResponse(
+        return _json_response(
             {"error": "Incorrect password or corrupted log file"},
             status=400,
         )
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
-
-    # Save password in memory
-    global LOG_PASSWORD
-    LOG_PASSWORD = password
-
-    return JsonResponse({"logs": _serialize_log(entries)})
+    except OSError as e:
+        return _json_response({"error": str(e)}, status=500)
+
+    # Keep the key in memory for this browser session only
+    now = time.monotonic()
+    sid = secrets.token_urlsafe(32)
+    with _LOG_SESSIONS_LOCK:
+        for stale in [k for k, (_, exp) in _LOG_SESSIONS.items() if exp < now]:
+            del _LOG_SESSIONS[stale]
+        _LOG_SESSIONS[sid] = (key, now + LOG_SESSION_TTL)
+
+    response = _json_response({"logs": _serialize_log(entries)})
+    response.set_cookie(
+        LOG_SESSION_COOKIE,
+        sid,
+        max_age=LOG_SESSION_TTL,
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
 
 
-def _filter_logs(entries: List[LogEntry], log_type: str | None, start_str: str, end_str: str) -> List[LogEntry]:
+def _filter_logs(
+    entries: List[LogEntry],
+    log_type: str | None,
+    start_date: date | None,
+    end_date: date | None,
+) -> List[LogEntry]:
+    """Return the entries matching the type and date filters, in order."""
     log_type = (log_type or "").strip()
-    start_date: date | None = None
-    end_date: date | None = None
-
-    if start_str:
-        try:
-            start_date = datetime.strptime(start_str, "%Y-%m-%d").date()
-        except ValueError:
-            pass
-
-    if end_str:
-        try:
-            end_date = datetime.strptime(end_str, "%Y-%m-%d").date()
-        except ValueError:
-            pass
+    match_type = log_type if log_type and log_type != "All" else None
+    # Entries logged in the same second share a timestamp; parse each once
+    dates: Dict[str, date | None] = {}
 
     out: List[LogEntry] = []
+    append = out.append
     for e in entries:
-        if log_type and log_type != "All" and e.event_type != log_type:
+        if match_type is not None and e.event_type != match_type:
             continue
 
-        dt = _parse_iso(e.timestamp)
-        if dt:
-            d = dt.date()
-            if start_date and d < start_date:
-                continue
-            if end_date and d > end_date:
-                continue
-
-        out.append(e)
+        if start_date or end_date:
+            ts = e.timestamp
+            if ts in dates:
+                d = dates[ts]
+            else:
+                d = dates[ts] = _parse_iso_date(ts)
+            if d:
+                if start_date and d < start_date:
+                    continue
+                if end_date and d > end_date:
+                    continue
+
+        append(e)
     return out
 
 
-def list_logs(request: HttpRequest) -> JsonResponse:
+def _logs_etag(request: HttpRequest) -> str | None:
+    """
+    ETag for list_logs, derived from the log file stamp and the in-memory
+    version, so an unchanged poll is answered with a 304 without decrypting.
+    """
+    if _log_key(request) is None:
+        return None
+    mtime_ns, size = _log_file_stamp() or (0, 0)
+    return f"{mtime_ns:x}-{size:x}-{_LOG_VERSION:x}"
+
+
+@condition(etag_func=_logs_etag)
+def list_logs(request: HttpRequest) -> HttpResponse:
     """
     GET /api/logs/?type=email_summary&start=YYYY-MM-DD&end=YYYY-MM-DD
     """
-    global LOG_PASSWORD
-    if LOG_PASSWORD is None:
-        return JsonResponse({"error": "Logs are locked"}, status=403)
+    key = _log_key(request)
+    if key is None:
+        return _json_response({"error": "Logs are locked"}, status=403)
 
     log_type = request.GET.get("type", "")
     start_str = request.GET.get("start", "")
     end_str = request.GET.get("end", "")
 
+    # Validate filters before paying for a decrypt
     try:
-        entries = LOG_STORE.load_logs(LOG_PASSWORD)
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        start_date = date.fromisoformat(start_str) if start_str else None
+        end_date = date.fromisoformat(end_str) if end_str else None
+    except ValueError:
+        return _json_response(
+            {"error": "start and end must be in YYYY-MM-DD format"},
+            status=400,
+        )
+    if start_date and end_date and start_date > end_date:
+        return _json_response({"logs": []})
 
-    filtered = _filter_logs(entries, log_type, start_str, end_str)
-    # NOTE: we still need original indices from full list, so we rebuild against full `entries`
-    indexed = _serialize_log(entries)
-    # Keep only IDs that are in filtered subset
-    filtered_ids = {entries.index(e) for e in filtered}
-    out = [item for item in indexed if item["id"] in filtered_ids]
+    try:
+        entries = _get_entries(key)
+    except (OSError, ValueError) as e:
+        return _json_response({"error": str(e)}, status=500)
+
+    out = _serialize_log(_filter_logs(entries, log_type, start_date, end_date))
 
-    return JsonResponse({"logs": out})
+    return _json_response({"logs": out})
 
 
 @csrf_exempt
-def delete_log(request: HttpRequest) -> JsonResponse:
+def delete_log(request: HttpRequest) -> HttpResponse:
     """
-    POST { "id": <log_index> }
+    POST { "id": "<log entry id>" }
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "POST required"}, status=405)
+        return _json_response({"detail": "POST required"}, status=405)
 
-    global LOG_PASSWORD
-    if LOG_PASSWORD is None:
-        return JsonResponse({"error": "Logs are locked"}, status=403)
+    key = _log_key(request)
+    if key is None:
+        return _json_response({"error": "Logs are locked"}, status=403)
 
     data = _json_body(request)
-    try:
-        idx = int(data.get("id"))
-    except Exception:
-        return JsonResponse({"error": "id must be an integer"}, status=400)
+    entry_id = data.get("id")
+    if not isinstance(entry_id, str) or not entry_id:
+        return _json_response({"error": "id must be a log entry id"}, status=400)
 
     try:
-        entries = LOG_STORE.load_logs(LOG_PASSWORD)
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
-
-    if idx < 0 or idx >= len(entries):
-        return JsonResponse({"error": "invalid id"}, status=400)
+        entries = _get_entries(key)
+    except (OSError, ValueError) as e:
+        return _json_response({"error": str(e)}, status=500)
 
-    # Remove that entry
-    del entries[idx]
+    kept = [e for e in entries if e.entry_id != entry_id]
+    if len(kept) == len(entries):
+        return _json_response({"error": "invalid id"}, status=400)
 
+    # Queue behind any pending appends, so the entry's own frame is written
+    # before its tombstone
+    _invalidate_log_cache()
     try:
-        LOG_STORE.save_logs(entries, LOG_PASSWORD)
-    except Exception as e:
-        return JsonResponse({"error": f"failed to save logs: {e}"}, status=500)
+        _LOG_WRITER.submit(LOG_STORE.delete_log, entry_id, key).result()
+    except (OSError, ValueError) as e:
+        return _json_response({"error": f"failed to save logs: {e}"}, status=500)
 
-    return JsonResponse({"logs": _serialize_log(entries)})
+    return _json_response({"logs": _serialize_log(kept)})
@@ -17,16 +17,24 @@ Run this file directly:
 
 from __future__ import annotations
 
+import functools
 import json
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, date
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter.scrolledtext import ScrolledText
 
+import orjson
+
 from email_fetcher import fetch_recent_messages
-from llm_client import LLMClient
-from log_storage import EncryptedLogStore
-from prompts import EMAIL_SUMMARY_PROMPT, RESUME_TAILOR_PROMPT
+from email_summarizer import summarize_email_texts
+from llm_client import LLMClient, LLMError
+from log_storage import EncryptedLogStore, LogEntry
+from prompts import resume_tailor_prompt
 
 
 def _parse_iso_timestamp(ts: str) -> datetime | None:
@@ -37,6 +45,15 @@ def _parse_iso_timestamp(ts: str) -> datetime | None:
     """
     if not ts:
         return None
+    if len(ts) == 20 and ts[19] == "Z" and ts[10] == "T":
+        # Fast path for the exact shape create_entry writes
+        try:
+            return datetime(
+                int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+                int(ts[11:13]), int(ts[14:16]), int(ts[17:19]),
+            )
+        except ValueError:
+            pass
     try:
         if ts.endswith("Z"):
             ts = ts[:-1]
@@ -45,6 +62,60 @@ def _parse_iso_timestamp(ts: str) -> datetime | None:
         return None
 
 
+@functools.lru_cache(maxsize=1)
+def _get_client() -> LLMClient:
+    """Shared LLMClient, so its connection and response cache survive runs."""
+    return LLMClient()
+
+
+@dataclass(slots=True, eq=False)
+class _LogRow:
+    """A decrypted log entry plus values derived from it once at load time."""
+    entry: LogEntry
+    day: date | None  # None if the timestamp doesn't parse
+    meta_preview: str  # one-line meta for the table, truncated to 80 chars
+    _meta_pretty: str | None = None
+
+    @classmethod
+    def from_entry(cls, entry: LogEntry) -> "_LogRow":
+        dt = _parse_iso_timestamp(entry.timestamp)
+        meta_str = json.dumps(entry.meta, ensure_ascii=False)
+        if len(meta_str) > 80:
+            meta_str = meta_str[:77] + "..."
+        return cls(entry=entry, day=dt.date() if dt else None, meta_preview=meta_str)
+
+    @property
+    def meta_pretty(self) -> str:
+        """Indented meta for the details pane, serialized on first use."""
+        if self._meta_pretty is None:
+            self._meta_pretty = json.dumps(self.entry.meta, ensure_ascii=False, indent=2)
+        return self._meta_pretty
+
+
+class _LogBucket:
+    """
+    Rows of one event type (or of all types), indexed for date-range lookups.
+
+    `rows` keeps file order; `dated` holds the rows with a parseable date,
+    stably sorted by day, so a date window is two bisects and a slice.
+    """
+
+    __slots__ = ("rows", "dated", "days")
+
+    def __init__(self, rows: list[_LogRow]):
+        self.rows = rows
+        self.dated = sorted((r for r in rows if r.day is not None), key=lambda r: r.day)
+        self.days = [r.day for r in self.dated]
+
+    def select(self, start: date | None, end: date | None) -> list[_LogRow]:
+        if start is None and end is None:
+            # Undated rows are only shown when there's no date filter
+            return self.rows
+        lo = bisect_left(self.days, start) if start else 0
+        hi = bisect_right(self.days, end) if end else len(self.days)
+        return self.dated[lo:hi]
+
+
 class LocalAgentApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -55,11 +126,29 @@ class LocalAgentApp(tk.Tk):
         # Log-related
         self.log_store = EncryptedLogStore()
         self.log_password: str | None = None  # set after successful unlock
-        self._all_logs: list = []             # full decrypted list
-        self._filtered_logs: list = []        # filtered subset
+        self._all_logs: list[_LogRow] = []       # full decrypted list
+        self._filtered_logs: list[_LogRow] = []  # filtered subset
+        # event type (None = all types) -> rows of that type, rebuilt on load
+        self._log_index: dict[str | None, _LogBucket] = {}
+
+        # Only one page of the filtered logs is inserted into the Treeview
+        self.page_size = 500
+        self.page_index = 0
+
+        # Gmail message id -> generated summary, so re-running the summary
+        # only sends new messages to the LLM
+        self._summary_cache: dict[str, str] = {}
+
+        # Gmail/LLM calls run here so the Tk event loop stays responsive
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent")
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self._build_ui()
 
+    def _on_close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
     # ---------- UI construction ----------
 
     def _build_ui(self):
@@ -90,15 +179,22 @@ class LocalAgentApp(tk.Tk):
         email_count_entry = ttk.Entry(email_frame, width=5, textvariable=self.email_count_var)
         email_count_entry.grid(row=0, column=1, sticky="w", padx=(5, 10))
 
+        ttk.Label(email_frame, text="Gmail search (optional):").grid(
+            row=0, column=2, sticky="w"
+        )
+        self.email_query_var = tk.StringVar(value="")
+        email_query_entry = ttk.Entry(email_frame, width=30, textvariable=self.email_query_var)
+        email_query_entry.grid(row=0, column=3, sticky="w", padx=(5, 10))
+
         self.email_run_button = ttk.Button(
             email_frame,
             text="Run",
             command=self.run_email_summary,
         )
-        self.email_run_button.grid(row=0, column=2, padx=5)
+        self.email_run_button.grid(row=0, column=4, padx=5)
 
         self.email_output = ScrolledText(email_frame, height=10, wrap="word")
-        self.email_output.grid(row=1, column=0, columnspan=3, sticky="nsew", pady=(8, 0))
+        self.email_output.grid(row=1, column=0, columnspan=5, sticky="nsew", pady=(8, 0))
 
         email_frame.grid_columnconfigure(0, weight=1)
         email_frame.grid_rowconfigure(1, weight=1)
@@ -195,7 +291,18 @@ class LocalAgentApp(tk.Tk):
         clear_btn = ttk.Button(filter_frame, text="Clear Filter", command=self.clear_log_filter)
         clear_btn.grid(row=0, column=7, sticky="w", padx=(4, 0))
 
-        for c in range(8):
+        prev_btn = ttk.Button(filter_frame, text="< Prev", command=self.prev_log_page)
+        prev_btn.grid(row=0, column=8, sticky="w", padx=(10, 0))
+
+        self.log_page_var = tk.StringVar(value="Page 1 / 1")
+        ttk.Label(filter_frame, textvariable=self.log_page_var).grid(
+            row=0, column=9, sticky="w", padx=(4, 4)
+        )
+
+        next_btn = ttk.Button(filter_frame, text="Next >", command=self.next_log_page)
+        next_btn.grid(row=0, column=10, sticky="w")
+
+        for c in range(11):
             filter_frame.grid_columnconfigure(c, weight=0)
         filter_frame.grid_columnconfigure(1, weight=1)
 
@@ -252,70 +359,101 @@ class LocalAgentApp(tk.Tk):
         """
         Summarize recent emails and display the result in the UI.
         Also append to encrypted logs if a log password is set.
+
+        The Gmail/LLM work runs on a worker thread; the UI is updated in
+        `_on_email_done` back on the Tk thread.
         """
         try:
             n = int(self.email_count_var.get().strip())
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter a valid number of emails.")
             return
+        query = self.email_query_var.get().strip() or None
 
-        self.email_output.delete("1.0", tk.END)
-        self.email_output.insert(tk.END, "Fetching emails and generating summaries...\n")
+        self.email_output.replace("1.0", tk.END, "Fetching emails and generating summaries...\n")
         self.email_run_button.config(state="disabled")
-        self.update_idletasks()
 
-        try:
-            client = LLMClient()
-            msgs = fetch_recent_messages(n)
-        except Exception as e:
-            self.email_output.insert(tk.END, f"\n❌ Failed: {e}\n")
-            self.email_run_button.config(state="normal")
-            return
+        future = self._pool.submit(self._do_email_summary, n, query, self.log_password)
+        future.add_done_callback(lambda f: self.after(0, self._on_email_done, f))
 
+    def _do_email_summary(self, n: int, query: str | None, log_password: str | None):
+        """
+        Worker thread: fetch, summarize and log. Must not touch Tk widgets.
+
+        Returns (result text or None if there were no messages, log error).
+        """
+        client = _get_client()
+        msgs = fetch_recent_messages(n, query=query)
         if not msgs:
-            self.email_output.insert(tk.END, "\nNo messages found.\n")
-            self.email_run_button.config(state="normal")
-            return
+            return None, None
+
+        todo = [m for m in msgs if m["id"] not in self._summary_cache]
+        summaries = summarize_email_texts(client, [m["snippet"] for m in todo])
+        fresh = dict(zip((m["id"] for m in todo), summaries))
+        for msg_id, summary in fresh.items():
+            if not isinstance(summary, LLMError):
+                self._summary_cache[msg_id] = summary
 
         full_text_parts = []
         for m in msgs:
-            prompt = EMAIL_SUMMARY_PROMPT.format(email=m["snippet"])
-            try:
-                summary = client.generate(prompt, max_tokens=256, task_type="email")
-            except Exception as e:
-                summary = f"[Error generating summary: {e}]"
-
+            summary = self._summary_cache.get(m["id"])
+            if summary is None:
+                summary = f"[Error generating summary: {fresh[m['id']]}]"
             block = f"---\nSubject: {m['subject']}\n{summary}\n"
             full_text_parts.append(block)
 
         result = "\n".join(full_text_parts)
-        self.email_output.delete("1.0", tk.END)
-        self.email_output.insert(tk.END, result)
 
         # Log event (if log password is set)
-        if self.log_password:
-            preview = result[:1500]
+        log_error = None
+        if log_password:
             entry = self.log_store.create_entry(
                 event_type="email_summary",
                 meta={"count": len(msgs)},
-                preview=preview,
+                preview=result[:1500],
             )
             try:
-                self.log_store.append_log(entry, self.log_password)
-                # Refresh in-memory logs if already unlocked
-                self._reload_logs_in_memory()
+                self.log_store.append_log(entry, log_password)
             except Exception as e:
-                messagebox.showwarning(
-                    "Log Error",
-                    f"Could not write to encrypted log file:\n{e}",
-                )
+                log_error = e
+
+        return result, log_error
 
+    def _on_email_done(self, future):
         self.email_run_button.config(state="normal")
+        try:
+            result, log_error = future.result()
+        except Exception as e:
+            self.email_output.insert(tk.END, f"\n❌ Failed: {e}\n")
+            return
+
+        if result is None:
+            self.email_output.insert(tk.END, "\nNo messages found.\n")
+            return
+
+        self.email_output.replace("1.0", tk.END, result)
+        self._after_log_write(log_error)
+
+    def _after_log_write(self, log_error):
+        """Refresh in-memory logs after a background append, or report its failure."""
+        if not self.log_password:
+            return
+        if log_error is not None:
+            messagebox.showwarning(
+                "Log Error",
+                f"Could not write to encrypted log file:\n{log_error}",
+            )
+            return
+        self._reload_logs_in_memory()
 
     def run_resume_tailor(self):
         """
         Run resume tailoring using the job description and resume text
         from the UI. Show formatted results and log the event.
+
+        The LLM call runs on a worker thread and its output is streamed into
+        the output box as it arrives; the final formatting happens in
+        `_on_resume_done` back on the Tk thread.
         """
         job_text = self.job_text_widget.get("1.0", tk.END).strip()
         resume_text = self.resume_text_widget.get("1.0", tk.END).strip()
@@ -327,38 +465,48 @@ class LocalAgentApp(tk.Tk):
             messagebox.showerror("Missing Resume", "Please paste your resume text.")
             return
 
-        self.resume_output.delete("1.0", tk.END)
-        self.resume_output.insert(tk.END, "Generating tailored profile, bullets, and cover letter...\n")
+        self.resume_output.replace(
+            "1.0", tk.END, "Generating tailored profile, bullets, and cover letter...\n"
+        )
         self.resume_run_button.config(state="disabled")
-        self.update_idletasks()
 
-        client = LLMClient()
-        prompt = RESUME_TAILOR_PROMPT.format(job_text=job_text, resume_text=resume_text)
+        future = self._pool.submit(
+            self._do_resume_tailor, job_text, resume_text, self.log_password
+        )
+        future.add_done_callback(lambda f: self.after(0, self._on_resume_done, f))
 
-        try:
-            raw_output = client.generate(
-                prompt,
-                max_tokens=1024,
-                temperature=0.4,
-                task_type="resume",
-            )
-        except Exception as e:
-            self.resume_output.insert(tk.END, f"\n❌ Failed to call LLM: {e}\n")
-            self.resume_run_button.config(state="normal")
-            return
+    def _do_resume_tailor(self, job_text: str, resume_text: str, log_password: str | None):
+        """
+        Worker thread: call the LLM, format and log. Must not touch Tk widgets.
+
+        Returns (text to show, log error).
+        """
+        client = _get_client()
+        prompt = resume_tailor_prompt(job_text, resume_text)
+
+        # Show the raw text as it streams in; it's replaced by the formatted
+        # result (or kept, if it isn't valid JSON) once the stream ends
+        self.after(0, self.resume_output.delete, "1.0", tk.END)
+        parts = []
+        for chunk in client.generate_stream(
+            prompt,
+            max_tokens=1024,
+            temperature=0.0,
+            task_type="resume",
+            response_format={"type": "json_object"},
+        ):
+            parts.append(chunk)
+            self.after(0, self.resume_output.insert, tk.END, chunk)
+        raw_output = "".join(parts).strip()
 
         try:
-            data = json.loads(raw_output)
-        except json.JSONDecodeError:
+            data = orjson.loads(raw_output)
+        except orjson.JSONDecodeError:
             # Show raw output to the user for manual salvage
-            self.resume_output.delete("1.0", tk.END)
-            self.resume_output.insert(
-                tk.END,
-                "⚠️ Could not parse JSON from model output. Raw response:\n\n"
+            return (
+                "⚠️ Could not parse JSON from model output. Raw response:\n\n" + raw_output,
+                None,
             )
-            self.resume_output.insert(tk.END, raw_output)
-            self.resume_run_button.config(state="normal")
-            return
 
         profile = data.get("profile", "")
         bullets = data.get("bullets", []) or []
@@ -373,27 +521,32 @@ class LocalAgentApp(tk.Tk):
         formatted.append(cover_letter)
 
         final_text = "".join(formatted)
-        self.resume_output.delete("1.0", tk.END)
-        self.resume_output.insert(tk.END, final_text)
 
         # Log event (if log password is set)
-        if self.log_password:
-            preview = final_text[:2000]
+        log_error = None
+        if log_password:
             entry = self.log_store.create_entry(
                 event_type="resume_tailor",
                 meta={"bullet_count": len(bullets)},
-                preview=preview,
+                preview=final_text[:2000],
             )
             try:
-                self.log_store.append_log(entry, self.log_password)
-                self._reload_logs_in_memory()
+                self.log_store.append_log(entry, log_password)
             except Exception as e:
-                messagebox.showwarning(
-                    "Log Error",
-                    f"Could not write to encrypted log file:\n{e}",
-                )
+                log_error = e
+
+        return final_text, log_error
 
+    def _on_resume_done(self, future):
         self.resume_run_button.config(state="normal")
+        try:
+            text, log_error = future.result()
+        except Exception as e:
+            self.resume_output.insert(tk.END, f"\n❌ Failed to call LLM: {e}\n")
+            return
+
+        self.resume_output.replace("1.0", tk.END, text)
+        self._after_log_write(log_error)
 
     # ---------- Log loading / filtering / selection ----------
 
@@ -428,7 +581,7 @@ class LocalAgentApp(tk.Tk):
 
         # At this point, password is valid (or no file existed yet)
         self.log_password = pw
-        self._all_logs = entries
+        self._set_all_logs(entries)
         self.apply_log_filter()
         messagebox.showinfo("Logs Unlocked", "Logs unlocked successfully.")
 
@@ -440,12 +593,25 @@ class LocalAgentApp(tk.Tk):
         if not self.log_password:
             return
         try:
-            self._all_logs = self.log_store.load_logs(self.log_password)
+            self._set_all_logs(self.log_store.load_logs(self.log_password))
             self.apply_log_filter()
         except Exception:
             # If this fails silently, worst case user can re-unlock manually.
             pass
 
+    def _set_all_logs(self, entries: list[LogEntry]):
+        """Replace the in-memory logs, parsing each timestamp once."""
+        self._all_logs = [_LogRow.from_entry(e) for e in entries]
+        self._index_logs()
+
+    def _index_logs(self):
+        """Rebuild the per-type buckets used by apply_log_filter."""
+        by_type: dict[str, list[_LogRow]] = defaultdict(list)
+        for row in self._all_logs:
+            by_type[row.entry.event_type].append(row)
+        self._log_index = {t: _LogBucket(rows) for t, rows in by_type.items()}
+        self._log_index[None] = _LogBucket(self._all_logs)
+
     def apply_log_filter(self):
         """
         Filter logs by type and optional date range, then refresh the UI.
@@ -477,29 +643,10 @@ class LocalAgentApp(tk.Tk):
                 )
                 return
 
-        results = []
-        for e in self._all_logs:
-            # Type filter
-            if log_type != "All" and e.event_type != log_type:
-                continue
-
-            # Date filter
-            dt = _parse_iso_timestamp(e.timestamp)
-            if dt is None:
-                # If timestamp is weird, show it only when no date filters
-                if not start_date and not end_date:
-                    results.append(e)
-                continue
-
-            d = dt.date()
-            if start_date and d < start_date:
-                continue
-            if end_date and d > end_date:
-                continue
-
-            results.append(e)
-
-        self._filtered_logs = results
+        # Narrow by type first (one dict lookup), then by date within that bucket
+        bucket = self._log_index.get(None if log_type == "All" else log_type)
+        self._filtered_logs = bucket.select(start_date, end_date) if bucket else []
+        self.page_index = 0
         self._refresh_logs_view()
 
     def clear_log_filter(self):
@@ -509,34 +656,65 @@ class LocalAgentApp(tk.Tk):
         self.log_type_var.set("All")
         self.log_start_date_var.set("")
         self.log_end_date_var.set("")
-        self._filtered_logs = list(self._all_logs)
+        self._filtered_logs = self._all_logs  # read-only, so no copy needed
+        self.page_index = 0
         self._refresh_logs_view()
 
+    def _page_count(self) -> int:
+        return max(1, -(-len(self._filtered_logs) // self.page_size))
+
+    def prev_log_page(self):
+        if self.page_index > 0:
+            self.page_index -= 1
+            self._refresh_logs_view()
+
+    def next_log_page(self):
+        if self.page_index < self._page_count() - 1:
+            self.page_index += 1
+            self._refresh_logs_view()
+
     def _refresh_logs_view(self):
         """
-        Re-render the Treeview based on self._filtered_logs.
+        Re-render the Treeview with the current page of self._filtered_logs.
+
+        Row iids are indices into the full filtered list, not the page.
         """
+        self.page_index = min(self.page_index, self._page_count() - 1)
+        self.log_page_var.set(f"Page {self.page_index + 1} / {self._page_count()}")
+
         # Clear selection & preview
         self.logs_tree.delete(*self.logs_tree.get_children())
         self.logs_preview.config(state="normal")
-        self.logs_preview.delete("1.0", tk.END)
-        self.logs_preview.insert(tk.END, "Select a log on the left to view details.\n")
+        placeholder = "Select a log on the left to view details.\n"
+        if not self._filtered_logs:
+            placeholder += "\nNo logs match the current filter.\n"
+        self.logs_preview.replace("1.0", tk.END, placeholder)
 
         if not self._filtered_logs:
-            self.logs_preview.insert(tk.END, "\nNo logs match the current filter.\n")
             self.logs_preview.config(state="disabled")
             return
 
-        for idx, e in enumerate(self._filtered_logs):
-            meta_str = json.dumps(e.meta, ensure_ascii=False)
-            if len(meta_str) > 80:
-                meta_str = meta_str[:77] + "..."
-            self.logs_tree.insert(
-                "",
-                "end",
-                iid=str(idx),
-                values=(e.timestamp, e.event_type, meta_str),
-            )
+        start = self.page_index * self.page_size
+        page = self._filtered_logs[start:start + self.page_size]
+        rows = [
+            (str(idx), (row.entry.timestamp, row.entry.event_type, row.meta_preview))
+            for idx, row in enumerate(page, start)
+        ]
+
+        # Take the tree off screen and mute the scrollbar while inserting so
+        # Tk doesn't relayout/redraw per row; call Tcl directly to skip the
+        # per-call option handling in Treeview.insert.
+        tree = self.logs_tree
+        yscroll = tree.cget("yscrollcommand")
+        tree.configure(yscrollcommand="")
+        tree.grid_remove()
+        try:
+            call, w = tree.tk.call, tree._w
+            for iid, values in rows:
+                call(w, "insert", "", "end", "-id", iid, "-values", values)
+        finally:
+            tree.configure(yscrollcommand=yscroll)
+            tree.grid()
 
         self.logs_preview.config(state="disabled")
 
@@ -556,15 +734,16 @@ class LocalAgentApp(tk.Tk):
         if idx < 0 or idx >= len(self._filtered_logs):
             return
 
-        e = self._filtered_logs[idx]
+        row = self._filtered_logs[idx]
+        e = row.entry
 
         self.logs_preview.config(state="normal")
-        self.logs_preview.delete("1.0", tk.END)
-        self.logs_preview.insert(
+        self.logs_preview.replace(
+            "1.0",
             tk.END,
             f"Time: {e.timestamp}\n"
             f"Type: {e.event_type}\n"
-            f"Meta: {json.dumps(e.meta, ensure_ascii=False, indent=2)}\n\n"
+            f"Meta: {row.meta_pretty}\n\n"
             f"Preview:\n{e.preview}\n",
         )
         self.logs_preview.config(state="disabled")
@@ -597,7 +776,7 @@ class LocalAgentApp(tk.Tk):
         if idx < 0 or idx >= len(self._filtered_logs):
             return
 
-        entry_to_delete = self._filtered_logs[idx]
+        row_to_delete = self._filtered_logs[idx]
 
         answer = messagebox.askyesno(
             "Confirm Delete",
@@ -606,16 +785,8 @@ class LocalAgentApp(tk.Tk):
         if not answer:
             return
 
-        # Remove from _all_logs by identity
-        new_all = []
-        for e in self._all_logs:
-            if e is entry_to_delete:
-                continue
-            new_all.append(e)
-        self._all_logs = new_all
-
         try:
-            self.log_store.save_logs(self._all_logs, self.log_password)
+            self.log_store.delete_log(row_to_delete.entry.entry_id, self.log_password)
         except Exception as e:
             messagebox.showerror(
                 "Error",
@@ -623,6 +794,10 @@ class LocalAgentApp(tk.Tk):
             )
             return
 
+        # Rows compare by identity, so this finds the exact entry
+        self._all_logs.remove(row_to_delete)
+        self._index_logs()
+
         # Re-apply filter and refresh view
         self.apply_log_filter()
         messagebox.showinfo("Deleted", "Log entry deleted successfully.")
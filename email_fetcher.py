@@ -4,13 +4,19 @@ Simple Gmail fetcher using google-auth-oauthlib and google-api-python-client.
 
 Supports:
 - `--init-auth` mode to run the OAuth installed-app flow once and persist tokens.
-- `fetch_recent_messages(max_results=10)` to retrieve recent email metadata.
+- `fetch_recent_messages(max_results=10, query=None)` to retrieve recent email
+  metadata, optionally narrowed server-side with a Gmail search query.
+- `iter_recent_messages(...)`, the same messages yielded in order, a chunk at
+  a time as Gmail returns them, so callers can start work on early ones.
 
 Gmail scope: readonly by default.
 """
 import argparse
+import contextlib
 import os
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, Tuple
 
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
@@ -21,6 +27,25 @@ from utils import get_credentials_path, env
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
+# Gmail recommends at most 50 calls per batch request
+GMAIL_BATCH_SIZE = 50
+
+# Gmail messages don't change once delivered, so fetched {id, subject, snippet}
+# records are kept in a small LRU keyed by message id and reused on later calls.
+MESSAGE_CACHE_SIZE = 512
+_message_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# The API views and the desktop worker pool fetch concurrently
+_message_cache_lock = threading.Lock()
+
+# Built Gmail services, reused while the stored tokens are unchanged. Each
+# keeps its authorized httplib2 connection (and refreshed access token) alive
+# between calls. httplib2 isn't thread-safe, so a service is checked out by
+# one caller at a time; pooling (rather than one per thread) lets Django's
+# per-connection request threads and the desktop workers share them.
+SERVICE_POOL_SIZE = 4
+_service_pool: List[Tuple[Tuple[Any, Any], Any]] = []
+_service_pool_lock = threading.Lock()
+
 TOKEN_KEY = env("OAUTH_TOKEN_KEY", "local_agent_gmail_token")
 store = TokenStore(TOKEN_KEY)
 
@@ -49,9 +74,14 @@ def init_auth() -> None:
     print("✅ Stored tokens in secure store (keyring or fallback file).")
 
 
-def load_creds() -> Credentials | None:
-    """Load credentials from secure storage."""
-    token_data = store.get(fallback_password=None)  # With keyring, no password needed
+def _load_token_data() -> Dict[str, Any] | None:
+    return store.get(fallback_password=None)  # With keyring, no password needed
+
+
+def load_creds(token_data: Dict[str, Any] | None = None) -> Credentials | None:
+    """Load credentials from secure storage (or from already-loaded token data)."""
+    if token_data is None:
+        token_data = _load_token_data()
     if not token_data:
         return None
 
@@ -66,10 +96,44 @@ def load_creds() -> Credentials | None:
     return creds
 
 
-def fetch_recent_messages(max_results: int = 10) -> List[Dict[str, Any]]:
+@contextlib.contextmanager
+def _checkout_service() -> Iterator[Any]:
+    """
+    Borrow a Gmail service from the shared pool, building one if none is
+    free or the stored tokens changed (e.g. after re-running --init-auth).
+    The caller has exclusive use of it until the block exits.
+    """
+    token_data = _load_token_data()
+    if not token_data:
+        raise RuntimeError("No creds found. Run with --init-auth first to authenticate.")
+
+    cache_key = (token_data.get("token"), token_data.get("refresh_token"))
+    service = None
+    with _service_pool_lock:
+        # Services built from older tokens are dropped, not reused
+        _service_pool[:] = [entry for entry in _service_pool if entry[0] == cache_key]
+        if _service_pool:
+            service = _service_pool.pop()[1]
+    if service is None:
+        service = build("gmail", "v1", credentials=load_creds(token_data))
+
+    try:
+        yield service
+    finally:
+        with _service_pool_lock:
+            if len(_service_pool) < SERVICE_POOL_SIZE:
+                _service_pool.append((cache_key, service))
+
+
+def fetch_recent_messages(
+    max_results: int = 10, query: str | None = None
+) -> List[Dict[str, Any]]:
     """
     Fetch the most recent messages from Gmail.
 
+    `query` uses Gmail search syntax (e.g. "newer_than:7d is:unread") and is
+    applied by Gmail, so only matching messages are listed and fetched.
+
     Returns a list of:
     {
       "id": "<message id>",
@@ -77,35 +141,114 @@ def fetch_recent_messages(max_results: int = 10) -> List[Dict[str, Any]]:
       "snippet": "<gmail snippet>"
     }
     """
-    creds = load_creds()
-    if not creds:
-        raise RuntimeError("No creds found. Run with --init-auth first to authenticate.")
+    return [m for chunk in iter_recent_messages(max_results, query) for m in chunk]
+
 
-    service = build("gmail", "v1", credentials=creds)
+def iter_recent_messages(
+    max_results: int = 10, query: str | None = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Like `fetch_recent_messages`, but yield the messages in order as lists,
+    each one as soon as it is complete: cached messages right away, the rest
+    after each batched Gmail request returns.
+    """
+    with _checkout_service() as service:
+        yield from _iter_messages(service, max_results, query)
+
+
+def _iter_messages(
+    service: Any, max_results: int, query: str | None
+) -> Iterator[List[Dict[str, Any]]]:
+    list_kwargs: Dict[str, Any] = {}
+    if query:
+        list_kwargs["q"] = query
     results = (
         service.users()
         .messages()
-        .list(userId="me", maxResults=max_results)
+        .list(
+            userId="me",
+            maxResults=max_results,
+            fields="messages/id,nextPageToken",
+            **list_kwargs,
+        )
         .execute()
     )
     messages = results.get("messages", [])
-    out: List[Dict[str, Any]] = []
-
-    for m in messages:
-        msg = (
-            service.users()
-            .messages()
-            .get(userId="me", id=m["id"], format="full")
-            .execute()
-        )
+    out: List[Dict[str, Any] | None] = [None] * len(messages)
+    errors: List[Exception] = []
+
+    missing: List[int] = []
+    with _message_cache_lock:
+        for i, m in enumerate(messages):
+            cached = _message_cache.get(m["id"])
+            if cached is None:
+                missing.append(i)
+            else:
+                _message_cache.move_to_end(m["id"])
+                out[i] = dict(cached)
+
+    def _on_message(request_id: str, msg: Dict[str, Any], exception: Exception | None) -> None:
+        if exception is not None:
+            errors.append(exception)
+            return
         headers = msg.get("payload", {}).get("headers", [])
-        subject = next(
-            (h["value"] for h in headers if h.get("name") == "Subject"), "(no subject)"
+        # metadataHeaders already limits this to Subject, so it's tiny
+        subject = {h.get("name"): h.get("value") for h in headers}.get(
+            "Subject", "(no subject)"
         )
         snippet = msg.get("snippet") or ""
-        out.append({"id": m["id"], "subject": subject, "snippet": snippet})
+        record = {"id": msg["id"], "subject": subject, "snippet": snippet}
+        out[int(request_id)] = record
 
-    return out
+        with _message_cache_lock:
+            _message_cache[msg["id"]] = dict(record)
+            if len(_message_cache) > MESSAGE_CACHE_SIZE:
+                _message_cache.popitem(last=False)
+
+    emitted = 0
+
+    def _ready() -> List[Dict[str, Any]]:
+        """Take the messages from `emitted` up to the first one still missing."""
+        nonlocal emitted
+        start = emitted
+        while emitted < len(out) and out[emitted] is not None:
+            emitted += 1
+        return out[start:emitted]  # type: ignore[return-value]
+
+    ready = _ready()
+    if ready:
+        yield ready
+
+    # One batched HTTP request per GMAIL_BATCH_SIZE messages instead of one
+    # round-trip each; request ids keep the results in list order.
+    for start in range(0, len(missing), GMAIL_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_on_message)
+        for i in missing[start:start + GMAIL_BATCH_SIZE]:
+            # `metadata` skips the MIME body and the `fields` mask drops
+            # labelIds, historyId, sizeEstimate, etc.: we only read Subject +
+            # snippet, so each response shrinks from a few KB to a few hundred bytes.
+            batch.add(
+                service.users().messages().get(
+                    userId="me",
+                    id=messages[i]["id"],
+                    format="metadata",
+                    metadataHeaders=["Subject"],
+                    fields="id,snippet,payload/headers",
+                ),
+                request_id=str(i),
+            )
+        batch.execute()
+
+        if errors:
+            raise errors[0]
+        ready = _ready()
+        if ready:
+            yield ready
+
+    # Anything Gmail answered without a record (shouldn't happen) is skipped
+    rest = [m for m in out[emitted:] if m is not None]
+    if rest:
+        yield rest
 
 
 if __name__ == "__main__":
@@ -119,11 +262,16 @@ if __name__ == "__main__":
         default=5,
         help="Number of recent emails to print (when not using --init-auth)",
     )
+    parser.add_argument(
+        "--query",
+        default=None,
+        help='Gmail search query to filter messages, e.g. "newer_than:7d is:unread"',
+    )
     args = parser.parse_args()
 
     if args.init_auth:
         init_auth()
     else:
-        msgs = fetch_recent_messages(args.max_results)
+        msgs = fetch_recent_messages(args.max_results, query=args.query)
         for m in msgs:
             print(f"- {m['subject']}: {m['snippet']}")
@@ -0,0 +1,62 @@
+# email_summarizer.py
+"""
+Batched email summarization: packs several emails into one prompt per LLM
+call and falls back to one prompt per email when a batch reply can't be
+parsed.
+"""
+from typing import List, Sequence, Union
+
+from llm_client import LLMClient, LLMError
+from prompts import (
+    email_summary_batch_prompt,
+    email_summary_prompt,
+    parse_email_summary_batch,
+)
+
+# Emails packed into one summarization prompt (keep within the model's context)
+EMAIL_BATCH_SIZE = 5
+
+
+def summarize_email_texts(
+    client: LLMClient, emails: Sequence[str]
+) -> List[Union[str, LLMError]]:
+    """
+    Summarize email texts in batches of EMAIL_BATCH_SIZE, one LLM call per
+    batch, with the batches sent concurrently. A batch whose reply can't be
+    parsed falls back to one call per email; an email whose call fails gets
+    its LLMError instead of a summary. Results are in input order.
+    """
+    if not emails:
+        return []
+
+    batches = [
+        emails[i:i + EMAIL_BATCH_SIZE] for i in range(0, len(emails), EMAIL_BATCH_SIZE)
+    ]
+    replies = client.generate_many(
+        [email_summary_batch_prompt(b) for b in batches],
+        max_tokens=256 * EMAIL_BATCH_SIZE,
+        task_type="email",
+    )
+
+    summaries: list = []
+    retry: List[int] = []
+    for batch, reply in zip(batches, replies):
+        parsed = None
+        if not isinstance(reply, LLMError):
+            parsed = parse_email_summary_batch(reply, len(batch))
+        if parsed is None:
+            retry.extend(range(len(summaries), len(summaries) + len(batch)))
+            parsed = [None] * len(batch)
+        summaries.extend(parsed)
+
+    if retry:
+        singles = client.generate_many(
+            [email_summary_prompt(emails[i]) for i in retry],
+            max_tokens=256,
+            task_type="email",
+        )
+        for i, summary in zip(retry, singles):
+            summaries[i] = summary
+
+    return summaries
+
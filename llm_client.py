@@ -20,15 +20,31 @@ Usage example:
 
     # Coding / Playwright script
     text = client.generate(prompt, task_type="code")
+
+    # Several prompts at once (concurrent, results in order)
+    texts = client.generate_many(prompts, task_type="email")
+
+    # Stream text chunks as the model produces them
+    for chunk in client.generate_stream(prompt, task_type="resume"):
+        print(chunk, end="", flush=True)
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import math
+import operator
 import os
-from typing import Optional
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Iterator, List, Optional, Sequence, Union
+
+import orjson
 
-from dotenv import load_dotenv
+from utils import load_env
 
-load_dotenv()
+load_env()
 
 # --- Environment defaults ---
 
@@ -46,10 +62,18 @@ DEFAULT_MODEL = (
     or "llama3.1:8b"
 )
 
+# Setting MODEL_FAST opts short, low-stakes work (email summaries and short
+# prompts without a task_type) into that smaller model. It stays opt-in so
+# nothing is routed to a model that hasn't been pulled.
+_FAST_MODEL_SET = bool(os.getenv("MODEL_FAST"))
+
+# Prompts shorter than this (in characters) count as short for routing
+SHORT_PROMPT_CHARS = 1500
+
 # Task → model routing (can be overridden via env)
 TASK_MODEL_MAP = {
     "default": DEFAULT_MODEL,  # general writing / summaries
-    "email": os.getenv("MODEL_EMAIL", DEFAULT_MODEL),
+    "email": os.getenv("MODEL_EMAIL") or os.getenv("MODEL_FAST") or DEFAULT_MODEL,
     "resume": os.getenv("MODEL_RESUME", DEFAULT_MODEL),
     "long_context": os.getenv("MODEL_LONG", "qwen2.5:14b"),
     "code": os.getenv("MODEL_CODE", "deepseek-coder-v2:16b"),
@@ -57,17 +81,138 @@ TASK_MODEL_MAP = {
     "fast": os.getenv("MODEL_FAST", "phi3:3.8b"),
 }
 
+# Upper bound on concurrent requests made by `generate_many`
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+# Completions kept per client by the exact-match response cache
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+
+
+# Opt-in semantic cache: a prompt whose embedding is at least this cosine-
+# similar to an earlier one (same model) reuses that earlier response.
+# Prompts built from one long template embed close together, so raise the
+# threshold if unrelated inputs start sharing answers.
+LLM_SEMANTIC_CACHE = os.getenv("LLM_SEMANTIC_CACHE", "0").lower() in ("1", "true", "yes")
+LLM_SEMANTIC_THRESHOLD = float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.92"))
+EMBED_MODEL = os.getenv("MODEL_EMBED", "nomic-embed-text")
+# Only these tasks are looked up semantically. Email summaries of repeated
+# newsletters/notifications are where near-duplicates occur; for resumes or
+# code a "similar" prompt still needs its own answer.
+SEMANTIC_TASK_TYPES = frozenset({"email"})
+
+
+def _cache_key(
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    response_format: Optional[dict] = None,
+) -> str:
+    """Stable key for a completion request, used for caching and single-flight."""
+    return hashlib.sha256(
+        orjson.dumps(
+            {
+                "model": model,
+                "prompt": prompt,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "response_format": response_format,
+            },
+            option=orjson.OPT_SORT_KEYS,
+        )
+    ).hexdigest()
+
+
+class LLMError(RuntimeError):
+    """Raised when the configured LLM backend fails to produce a completion."""
+
+
+class SemanticCache:
+    """
+    Responses indexed by prompt embedding. `lookup` returns the response of
+    the most similar earlier prompt made with the same model and generation
+    parameters, if the cosine similarity reaches `threshold`.
+
+    A linear scan over unit vectors: fine for a few hundred entries, which
+    is all it keeps (oldest entries are dropped first).
+    """
+
+    def __init__(
+        self,
+        threshold: float = LLM_SEMANTIC_THRESHOLD,
+        max_entries: int = LLM_CACHE_SIZE,
+    ):
+        self.threshold = threshold
+        # (params, unit vector, response); params is (model, max_tokens,
+        # temperature, response_format), compared by equality
+        self._entries: deque[tuple[tuple, List[float], str]] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vec: Sequence[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        return [x / norm for x in vec]
+
+    def lookup(self, params: tuple, vec: Sequence[float]) -> Optional[str]:
+        query = self._normalize(vec)
+        best_score, best = self.threshold, None
+        with self._lock:
+            entries = list(self._entries)
+        for entry_params, entry_vec, response in entries:
+            if entry_params != params or len(entry_vec) != len(query):
+                continue
+            score = sum(map(operator.mul, query, entry_vec))
+            if score >= best_score:
+                best_score, best = score, response
+        return best
+
+    def add(self, params: tuple, vec: Sequence[float], response: str) -> None:
+        with self._lock:
+            self._entries.append((params, self._normalize(vec), response))
+
 
 class LLMClient:
-    def __init__(self, provider: Optional[str] = None):
+    """
+    Thin wrapper over the configured backend.
+
+    One client can be shared across threads and reused for many `generate`
+    calls. Identical calls that overlap in time share a single backend
+    request, and repeated temperature-0 calls are answered from an
+    in-memory cache (see `generate`).
+    """
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        cache: bool = True,
+        semantic_cache: Optional[bool] = None,
+    ):
         """
         provider:
             - 'ollama' (default): local, free, uses HTTP to OpenAI-compatible API.
             - 'openai': real OpenAI cloud (requires OPENAI_API_KEY).
             - 'local': echo-only; no external calls.
+        cache:
+            Keep up to LLM_CACHE_SIZE temperature-0 completions in memory and
+            return them for identical requests. Hits/misses are counted in
+            `cache_stats`.
+        semantic_cache:
+            Also reuse responses for near-duplicate prompts, compared by
+            EMBED_MODEL embeddings (default: env LLM_SEMANTIC_CACHE, off).
+            Only used for temperature-0 calls with a task_type in
+            SEMANTIC_TASK_TYPES. Not available with the local echo backend.
         """
         self.provider = (provider or LLM_PROVIDER).lower()
 
+        # Exact-match response cache: request key -> completion (LRU order)
+        self._cache: OrderedDict[str, str] | None = OrderedDict() if cache else None
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {"hits": 0, "misses": 0, "semantic_hits": 0}
+
+        # Single-flight: request key -> Future of the call currently running
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
         if self.provider == "openai":
             # Cloud OpenAI using the official SDK
             from openai import OpenAI  # type: ignore
@@ -83,10 +228,23 @@ class LLMClient:
             self._mode = "openai_sdk"
 
         elif self.provider == "ollama":
-            # Local Ollama via raw HTTP (OpenAI-compatible /chat/completions)
+            # Local Ollama via raw HTTP (OpenAI-compatible /chat/completions).
+            # A Session keeps the TCP connection alive between calls; the pool
+            # holds one connection per concurrent `generate_many` call, and
+            # connection failures (e.g. Ollama still starting) are retried.
             import requests  # type: ignore
-
-            self._client = requests
+            from requests.adapters import HTTPAdapter  # type: ignore
+            from urllib3.util.retry import Retry  # type: ignore
+
+            pool_size = max(10, LLM_MAX_CONCURRENCY)
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=2, backoff_factor=0.2),
+            )
+            self._client = requests.Session()
+            self._client.mount("http://", adapter)
+            self._client.mount("https://", adapter)
             self._mode = "ollama_http"
             self._base_url = OPENAI_API_BASE
             self._api_key = OPENAI_API_KEY
@@ -96,14 +254,60 @@ class LLMClient:
             self._client = None
             self._mode = "local_echo"
 
+        if semantic_cache is None:
+            semantic_cache = LLM_SEMANTIC_CACHE
+        self._semantic: SemanticCache | None = (
+            SemanticCache() if semantic_cache and self._mode != "local_echo" else None
+        )
+
     # --- Routing helpers ---
 
-    def _choose_model(self, task_type: Optional[str]) -> str:
+    def _choose_model(self, task_type: Optional[str], prompt: str = "") -> str:
         """Return model name based on task_type and env configuration."""
         if not task_type:
+            if _FAST_MODEL_SET and prompt and len(prompt) < SHORT_PROMPT_CHARS:
+                return TASK_MODEL_MAP["fast"]
             return TASK_MODEL_MAP["default"]
         return TASK_MODEL_MAP.get(task_type, TASK_MODEL_MAP["default"])
 
+    # --- Response cache ---
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is None:
+                self.cache_stats["misses"] += 1
+            else:
+                self._cache.move_to_end(key)
+                self.cache_stats["hits"] += 1
+            return result
+
+    def _cache_put(self, key: str, result: str) -> None:
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > LLM_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed `text` with EMBED_MODEL, or None if the backend can't."""
+        try:
+            if self._mode == "openai_sdk":
+                resp = self._client.embeddings.create(model=EMBED_MODEL, input=text)
+                return list(resp.data[0].embedding)
+
+            r = self._client.post(
+                f"{self._base_url}/embeddings",
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                json={"model": EMBED_MODEL, "input": text},
+                timeout=30,
+            )
+            r.raise_for_status()
+            return r.json()["data"][0]["embedding"]
+        except Exception:
+            # A failed embedding only means a cache miss
+            return None
+
     # --- Main API ---
 
     def generate(
@@ -112,6 +316,7 @@ class LLMClient:
         max_tokens: int = 512,
         temperature: float = 0.2,
         task_type: Optional[str] = None,
+        response_format: Optional[dict] = None,
     ) -> str:
         """
         Generate a completion for the given prompt.
@@ -120,17 +325,89 @@ class LLMClient:
             'email', 'resume', 'long_context', 'code', 'repo_agent', 'fast', or None.
 
         The chosen model can be configured via environment variables.
+        Backend/transport failures are raised as LLMError.
+
+        response_format is passed through to the backend; use
+        {"type": "json_object"} to have the model emit a single valid JSON
+        object (OpenAI JSON mode, also supported by Ollama).
+
+        If an identical call (same model, prompt and parameters) is already
+        running on another thread, this waits for and returns its result
+        instead of sending a duplicate request. With temperature 0 the output
+        is treated as deterministic and cached, so a repeat returns at once.
         """
-        model = self._choose_model(task_type)
+        model = self._choose_model(task_type, prompt)
+        key = _cache_key(model, prompt, max_tokens, temperature, response_format)
+
+        cacheable = self._cache is not None and temperature == 0
+        if cacheable:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future: Future = Future()
+                self._inflight[key] = future
+        if pending is not None:
+            return pending.result()
+
+        try:
+            # Embedding inside the single-flight section, so identical
+            # concurrent calls make one embeddings request, not one each
+            params = (model, max_tokens, temperature, response_format)
+            semantic = (
+                self._semantic is not None
+                and temperature == 0
+                and task_type in SEMANTIC_TASK_TYPES
+            )
+            vec = self._embed(prompt) if semantic else None
+            similar = self._semantic.lookup(params, vec) if vec is not None else None
+            if similar is not None:
+                with self._cache_lock:
+                    self.cache_stats["semantic_hits"] += 1
+                result = similar
+            else:
+                result = self._generate(prompt, model, max_tokens, temperature, response_format)
+                if cacheable:
+                    self._cache_put(key, result)
+                if vec is not None:
+                    self._semantic.add(params, vec, result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _generate(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[dict] = None,
+    ) -> str:
+        """Make one completion request to the configured backend."""
 
         if self._mode == "openai_sdk":
             # Uses the official OpenAI Python client (cloud or compatible base_url)
-            resp = self._client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
+            from openai import OpenAIError  # type: ignore
+
+            try:
+                resp = self._client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **({"response_format": response_format} if response_format else {}),
+                )
+            except OpenAIError as e:
+                raise LLMError(str(e)) from e
             choice = resp.choices[0]
             msg = getattr(choice, "message", None)
             if msg is not None:
@@ -157,13 +434,20 @@ class LLMClient:
                 "max_tokens": max_tokens,
                 "temperature": temperature,
             }
+            if response_format:
+                payload["response_format"] = response_format
 
-            r = self._client.post(url, headers=headers, json=payload, timeout=120)
-            r.raise_for_status()
-            data = r.json()
+            from requests import RequestException  # type: ignore
+
+            try:
+                r = self._client.post(url, headers=headers, json=payload, timeout=120)
+                r.raise_for_status()
+                data = r.json()
+            except (RequestException, ValueError) as e:
+                raise LLMError(str(e)) from e
             try:
                 return data["choices"][0]["message"]["content"].strip()
-            except Exception:
+            except (KeyError, IndexError, TypeError, AttributeError):
                 # Fallback: just dump the JSON if shape is odd
                 return str(data)
 
@@ -171,6 +455,169 @@ class LLMClient:
         truncated = prompt[:1200]
         return f"[LOCAL_ECHO provider={self.provider} model={model}]\n{truncated}"
 
+    def generate_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        task_type: Optional[str] = None,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """
+        Like `generate`, but yield the completion in chunks as the backend
+        produces them. Joining the chunks gives the full text (unstripped).
+
+        Backend/transport failures, including mid-stream ones, are raised as
+        LLMError. Streams are not shared between identical concurrent calls,
+        but temperature-0 results use the same cache as `generate`.
+        """
+        model = self._choose_model(task_type, prompt)
+
+        if self._cache is None or temperature != 0:
+            yield from self._generate_stream(
+                prompt, model, max_tokens, temperature, response_format
+            )
+            return
+
+        key = _cache_key(model, prompt, max_tokens, temperature, response_format)
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        for chunk in self._generate_stream(
+            prompt, model, max_tokens, temperature, response_format
+        ):
+            parts.append(chunk)
+            yield chunk
+        # Same shape `generate` returns, so either call can hit the entry
+        self._cache_put(key, "".join(parts).strip())
+
+    def _generate_stream(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """Stream one completion from the configured backend."""
+        if self._mode == "openai_sdk":
+            from openai import OpenAIError  # type: ignore
+
+            try:
+                stream = self._client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    **({"response_format": response_format} if response_format else {}),
+                )
+                for chunk in stream:
+                    if chunk.choices:
+                        text = chunk.choices[0].delta.content
+                        if text:
+                            yield text
+            except OpenAIError as e:
+                raise LLMError(str(e)) from e
+            return
+
+        if self._mode == "ollama_http":
+            # OpenAI-compatible server-sent events: `data: {...}` lines
+            # ending with `data: [DONE]`
+            url = f"{self._base_url}/chat/completions"
+            headers = {
+                "Authorization": f"Bearer {self._api_key}",
+                "Content-Type": "application/json",
+            }
+            payload = {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stream": True,
+            }
+            if response_format:
+                payload["response_format"] = response_format
+
+            from requests import RequestException  # type: ignore
+
+            try:
+                with self._client.post(
+                    url, headers=headers, json=payload, timeout=120, stream=True
+                ) as r:
+                    r.raise_for_status()
+                    for line in r.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            text = orjson.loads(data)["choices"][0]["delta"].get("content")
+                        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                            continue
+                        if text:
+                            yield text
+            except RequestException as e:
+                raise LLMError(str(e)) from e
+            return
+
+        # Local echo: the whole "completion" as one chunk
+        yield self._generate(prompt, model, max_tokens, temperature)
+
+    async def agenerate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        task_type: Optional[str] = None,
+    ) -> str:
+        """Async variant of `generate`; the blocking call runs in a worker thread."""
+        return await asyncio.to_thread(
+            self.generate, prompt, max_tokens, temperature, task_type
+        )
+
+    def generate_many(
+        self,
+        prompts: Sequence[str],
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        task_type: Optional[str] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+    ) -> List[Union[str, LLMError]]:
+        """
+        Generate completions for several prompts concurrently.
+
+        At most `max_concurrency` calls are in flight at once. Results come
+        back in prompt order; a failed call yields its LLMError instead of
+        raising, so one bad prompt doesn't discard the others.
+        """
+
+        async def _run() -> list:
+            sem = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def _one(prompt: str) -> str:
+                async with sem:
+                    return await self.agenerate(prompt, max_tokens, temperature, task_type)
+
+            return await asyncio.gather(
+                *(_one(p) for p in prompts), return_exceptions=True
+            )
+
+        results = asyncio.run(_run())
+        for r in results:
+            if isinstance(r, BaseException) and not isinstance(r, LLMError):
+                raise r
+        return results
+
+    def close(self) -> None:
+        """Release pooled HTTP connections (Ollama backend)."""
+        if self._mode == "ollama_http":
+            self._client.close()
+
     def __repr__(self) -> str:
         return f"<LLMClient provider={self.provider!r} mode={self._mode!r}>"
 
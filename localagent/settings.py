@@ -12,8 +12,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
-from dotenv import load_dotenv
-load_dotenv()
+from utils import load_env
+load_env()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Compress large JSON responses (log lists, cover letters) for gzip clients
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -123,7 +125,17 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-# CORS for React dev server
-CORS_ALLOW_ALL_ORIGINS = True  # dev only; tighten later if you want
+# CORS for React dev server. Credentialed requests carry the log session
+# cookie, so only the web UI's origin may read responses (never allow-all).
+# The cookie is SameSite=Lax on the API host (localhost, see API_BASE in
+# webui/src/App.tsx), so the UI must be served from the same host name:
+# a page on 127.0.0.1 would never send it. Override with a comma-separated
+# list when serving both under another host.
+CORS_ALLOWED_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:5173").split(",")
+    if origin.strip()
+]
+CORS_ALLOW_CREDENTIALS = True  # the web UI sends the log session cookie
 
 # For running on LAN, you'll typically access: http://<your-ip>:8000
\ No newline at end of file
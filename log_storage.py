@@ -2,49 +2,128 @@
 """
 Encrypted log storage for the Local Agent desktop app.
 
-- Stores all logs in a single encrypted file.
+- Stores logs in an append-only file of individually encrypted records.
 - Encryption key is derived from a password that YOU provide.
 - Without the correct password, logs cannot be read.
 
-Note: This uses a simple KDF similar to storage.py and is meant for
-local usage only. For production-grade security, you'd want a strong KDF
-like PBKDF2 or scrypt with salt and proper secret handling.
+File format: a header (MAGIC | 16-byte salt | password verifier) followed by
+one frame per record:
+
+    | u32 length | 12-byte nonce | AES-256-GCM ciphertext+tag |
+
+Each entry carries a stable random id. Appending a log writes a single frame
+to the end of the file, so its cost does not grow with the history. Deleting
+one appends a tombstone frame (`{"deleted": "<entry id>"}`), which drops
+that entry when the file is replayed; the file is only rewritten once
+tombstones pile up. The key is derived with scrypt from the password and the
+per-file salt, and cached in memory so the (deliberately slow) KDF only runs
+once per password; unlock() returns it as a LogKey that can stand in for the
+password. Files written by older versions (a single Fernet token,
+or frames without a verifier) are still readable and are upgraded when
+first loaded.
 """
 
 from __future__ import annotations
 
 import base64
-import json
-from dataclasses import dataclass
+import functools
+import hashlib
+import os
+import secrets
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 
+import orjson
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 # Encrypted log file lives in your home directory by default
 DEFAULT_LOG_FILE = Path.home() / ".local_agent_history.enc"
 
+_MAGIC = b"LALOG3"
+_SALT_LEN = 16
+_NONCE_LEN = 12
+_SALT_END = len(_MAGIC) + _SALT_LEN
+# The header ends with a verifier: a nonce plus the GCM tag of an empty
+# message, so the password is checked even when the log has no frames
+_VERIFIER_LEN = _NONCE_LEN + 16
+_HEADER_LEN = _SALT_END + _VERIFIER_LEN
+_FRAME_LEN = struct.Struct(">I")
+
+# Previous frame format: MAGIC | salt with no verifier, index tombstones
+_V2_MAGIC = b"LALOG2"
+_V2_HEADER_LEN = len(_V2_MAGIC) + _SALT_LEN
+
+_BAD_PASSWORD = "Incorrect password or corrupted log file."
+
+# Rewrite the file once tombstones make up this share of its frames
+COMPACT_RATIO = 0.2
+
+# Verified ciphers kept per store (one per password and file salt)
+AEAD_CACHE_SIZE = 4
+
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+    """Derive a raw 32-byte AES key from the password with scrypt."""
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=2**14, r=8, p=1, dklen=32
+    )
+
 
+def _iter_frames(blob: bytes, pos: int = _HEADER_LEN) -> Iterator[bytes]:
+    """Yield the `nonce | ciphertext` body of each frame from `pos` on."""
+    end = len(blob)
+    while pos + _FRAME_LEN.size <= end:
+        (size,) = _FRAME_LEN.unpack_from(blob, pos)
+        pos += _FRAME_LEN.size
+        if pos + size > end:
+            # Truncated trailing frame from an interrupted append (the next
+            # append truncates it away before writing)
+            break
+        yield blob[pos:pos + size]
+        pos += size
+
+
+def _parse_record(data: bytes) -> Dict[str, Any] | None:
+    """Decode one decrypted frame, or None if it isn't a JSON object."""
+    try:
+        item = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return None
+    return item if isinstance(item, dict) else None
+
+
+@functools.lru_cache(maxsize=4)
 def _derive_key_from_password(password: str) -> bytes:
     """
-    Derive a 32-byte key from the password and encode as urlsafe base64.
-
-    This is intentionally simple and mirrors the approach in storage.py.
-    For strong security, use a real KDF like PBKDF2 or scrypt instead.
+    Legacy Fernet key derivation, only used to read pre-AES-GCM log files.
     """
     return base64.urlsafe_b64encode(password.encode("utf-8").ljust(32, b"0")[:32])
 
 
-@dataclass
+def _new_entry_id() -> str:
+    return secrets.token_hex(8)
+
+
+@dataclass(slots=True)
 class LogEntry:
     timestamp: str
     event_type: str
     meta: Dict[str, Any]
     preview: str
+    # Stable across processes and compactions; tombstones refer to it
+    entry_id: str = field(default_factory=_new_entry_id)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
+            "id": self.entry_id,
             "timestamp": self.timestamp,
             "event_type": self.event_type,
             "meta": self.meta,
@@ -53,70 +132,342 @@ class LogEntry:
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> "LogEntry":
+        # Positional args and one falsy-check per field: this runs once per
+        # entry on every load
+        get = data.get
         return LogEntry(
-            timestamp=data.get("timestamp", ""),
-            event_type=data.get("event_type", ""),
-            meta=data.get("meta", {}) or {},
-            preview=data.get("preview", "") or "",
+            get("timestamp", ""),
+            get("event_type", ""),
+            get("meta") or {},
+            get("preview") or "",
+            # Entries from older files have no id until they are rewritten
+            get("id") or _new_entry_id(),
         )
 
 
+class LogKey:
+    """
+    Cipher for one log file, returned by EncryptedLogStore.unlock(). Store
+    methods accept it in place of the password, so code that keeps the log
+    unlocked for a while never has to hold on to the password itself.
+    """
+
+    __slots__ = ("salt", "aead")
+
+    def __init__(self, salt: bytes, aead: AESGCM):
+        self.salt = salt
+        self.aead = aead
+
+
 class EncryptedLogStore:
     def __init__(self, path: Path | None = None):
         self.path = path or DEFAULT_LOG_FILE
+        # (sha256(password), salt) -> AESGCM cipher, so scrypt runs and the
+        # cipher is built once per password. Bounded, and only filled once
+        # the password has been verified, so failed unlocks keep nothing.
+        self._aead_cache: OrderedDict[Tuple[str, bytes], AESGCM] = OrderedDict()
+        self._aead_lock = threading.Lock()
+        # (frames, tombstones) in the file as last seen by this store, or
+        # None if unknown; only used to decide when to compact
+        self._frame_stats: Tuple[int, int] | None = None
+        # Offset just past the last complete frame as last seen by this
+        # store, so appends can skip rescanning the frame lengths
+        self._frames_end: int | None = None
 
-    def _fernet(self, password: str) -> Fernet:
-        key = _derive_key_from_password(password)
-        return Fernet(key)
+    def _remember_aead(self, cache_key: Tuple[str, bytes], aead: AESGCM) -> None:
+        with self._aead_lock:
+            self._aead_cache[cache_key] = aead
+            self._aead_cache.move_to_end(cache_key)
+            while len(self._aead_cache) > AEAD_CACHE_SIZE:
+                self._aead_cache.popitem(last=False)
 
-    def load_logs(self, password: str) -> List[LogEntry]:
-        """
-        Decrypt and return the list of LogEntry objects.
+    @staticmethod
+    def _aead_cache_key(password: str, salt: bytes) -> Tuple[str, bytes]:
+        return (hashlib.sha256(password.encode("utf-8")).hexdigest(), salt)
 
-        If the log file does not exist, returns an empty list.
-        If the password is wrong or file is corrupted, raises ValueError.
+    def _unlock(self, password: str | LogKey, header: bytes) -> AESGCM:
         """
-        if not self.path.exists():
-            return []
+        Return the cipher for `password` after checking it against the
+        header's verifier; raises ValueError if it doesn't match.
+        """
+        if isinstance(password, LogKey):
+            # A key unlocked for a file that has since been replaced
+            if password.salt != header[len(_MAGIC):_SALT_END]:
+                raise ValueError(_BAD_PASSWORD)
+            self._verify_header(password.aead, header)
+            return password.aead
+        cache_key = self._aead_cache_key(password, header[len(_MAGIC):_SALT_END])
+        with self._aead_lock:
+            aead = self._aead_cache.get(cache_key)
+            if aead is not None:
+                self._aead_cache.move_to_end(cache_key)
+        if aead is None:
+            aead = AESGCM(_derive_key(password, cache_key[1]))
+            self._verify_header(aead, header)
+            self._remember_aead(cache_key, aead)
+        else:
+            self._verify_header(aead, header)
+        return aead
+
+    def _file_header(self) -> bytes | None:
+        """Return the header of the existing log file, if it is in the current format."""
+        try:
+            with self.path.open("rb") as fh:
+                header = fh.read(_HEADER_LEN)
+        except FileNotFoundError:
+            return None
+        if len(header) == _HEADER_LEN and header.startswith(_MAGIC):
+            return header
+        return None
+
+    def _new_header(self, password: str | LogKey) -> Tuple[bytes, AESGCM]:
+        """Header (salt plus verifier) and cipher for a new log file."""
+        if isinstance(password, LogKey):
+            salted, aead = _MAGIC + password.salt, password.aead
+        else:
+            salted = _MAGIC + os.urandom(_SALT_LEN)
+            aead = AESGCM(_derive_key(password, salted[len(_MAGIC):]))
+            self._remember_aead(self._aead_cache_key(password, salted[len(_MAGIC):]), aead)
+        nonce = os.urandom(_NONCE_LEN)
+        return salted + nonce + aead.encrypt(nonce, b"", salted), aead
+
+    @staticmethod
+    def _verify_header(aead: AESGCM, header: bytes) -> None:
+        """Raise ValueError unless the header's verifier decrypts with `aead`."""
+        verifier = header[_SALT_END:]
+        try:
+            aead.decrypt(verifier[:_NONCE_LEN], verifier[_NONCE_LEN:], header[:_SALT_END])
+        except InvalidTag as e:
+            raise ValueError(_BAD_PASSWORD) from e
 
-        f = self._fernet(password)
-        token = self.path.read_bytes()
+    @staticmethod
+    def _encrypt_frame(aead: AESGCM, header: bytes, record: Dict[str, Any]) -> bytes:
+        nonce = os.urandom(_NONCE_LEN)
+        data = orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS)
+        body = nonce + aead.encrypt(nonce, data, header)
+        return _FRAME_LEN.pack(len(body)) + body
+
+    @staticmethod
+    def _decrypt_frame(aead: AESGCM, header: bytes, frame: bytes) -> bytes:
+        try:
+            return aead.decrypt(frame[:_NONCE_LEN], frame[_NONCE_LEN:], header)
+        except (InvalidTag, ValueError) as e:
+            raise ValueError(_BAD_PASSWORD) from e
+
+    def _load_legacy(self, blob: bytes, password: str) -> List[LogEntry]:
+        """Read a file written as a single Fernet token by older versions."""
         try:
-            data = f.decrypt(token)
+            data = Fernet(_derive_key_from_password(password)).decrypt(blob)
         except InvalidToken as e:
-            raise ValueError("Incorrect password or corrupted log file.") from e
+            raise ValueError(_BAD_PASSWORD) from e
 
         try:
-            raw = json.loads(data.decode("utf-8"))
-        except json.JSONDecodeError:
+            raw = orjson.loads(data)
+        except orjson.JSONDecodeError:
             return []
 
         if not isinstance(raw, list):
             return []
+        return [LogEntry.from_dict(item) for item in raw if isinstance(item, dict)]
 
+    def _load_v2(self, blob: bytes, password: str) -> List[LogEntry]:
+        """
+        Read the previous frame format (no header verifier, tombstones by
+        index). A file with no frames can't be checked and reads as empty.
+        """
+        salted = blob[:_V2_HEADER_LEN]
+        aead = AESGCM(_derive_key(password, salted[len(_V2_MAGIC):]))
         entries: List[LogEntry] = []
-        for item in raw:
-            if isinstance(item, dict):
-                entries.append(LogEntry.from_dict(item))
+        for frame in _iter_frames(blob, _V2_HEADER_LEN):
+            item = _parse_record(self._decrypt_frame(aead, salted, frame))
+            if item is None:
+                continue
+            if "deleted" in item:
+                idx = item["deleted"]
+                if isinstance(idx, int) and 0 <= idx < len(entries):
+                    del entries[idx]
+                continue
+            entries.append(LogEntry.from_dict(item))
         return entries
 
-    def save_logs(self, entries: List[LogEntry], password: str) -> None:
+    def unlock(self, password: str) -> LogKey:
+        """
+        Check `password` against the log file and return a LogKey for it.
+        A missing log is created empty and an older file is upgraded first,
+        so the key always matches the file's header.
+
+        If the password is wrong or file is corrupted, raises ValueError.
+        """
+        if self._file_header() is None:
+            entries = self.load_logs(password)
+            if self._file_header() is None:
+                self.save_logs(entries, password)
+        header = self._file_header()
+        if header is None:
+            raise ValueError(_BAD_PASSWORD)
+        return LogKey(header[len(_MAGIC):_SALT_END], self._unlock(password, header))
+
+    def load_logs(self, password: str | LogKey) -> List[LogEntry]:
+        """
+        Decrypt and return the list of LogEntry objects.
+
+        If the log file does not exist, returns an empty list.
+        If the password is wrong or file is corrupted, raises ValueError.
+        """
+        if not self.path.exists():
+            return []
+
+        blob = self.path.read_bytes()
+        if not blob.startswith(_MAGIC) or len(blob) < _HEADER_LEN:
+            if isinstance(password, LogKey):
+                # Keys only exist for current-format files (see unlock)
+                raise ValueError(_BAD_PASSWORD)
+            if blob.startswith(_V2_MAGIC):
+                entries = self._load_v2(blob, password)
+            else:
+                entries = self._load_legacy(blob, password)
+            # Upgrade to the current format now, so later appends are O(1)
+            # instead of waiting for the first write to do the rewrite
+            try:
+                self.save_logs(entries, password)
+            except OSError:
+                pass
+            return entries
+
+        header = blob[:_HEADER_LEN]
+        aead = self._unlock(password, header)
+
+        # Insertion-ordered, so a tombstone removes its entry in O(1)
+        entries: Dict[str, LogEntry] = {}
+        frames = tombstones = 0
+        end = _HEADER_LEN
+        for frame in _iter_frames(blob):
+            frames += 1
+            end += _FRAME_LEN.size + len(frame)
+            item = _parse_record(self._decrypt_frame(aead, header, frame))
+            if item is None:
+                continue
+            if "deleted" in item:
+                tombstones += 1
+                entry_id = item["deleted"]
+                if isinstance(entry_id, str):
+                    entries.pop(entry_id, None)
+                continue
+            entry = LogEntry.from_dict(item)
+            entries[entry.entry_id] = entry
+        self._frame_stats = (frames, tombstones)
+        self._frames_end = end
+        return list(entries.values())
+
+    def save_logs(self, entries: List[LogEntry], password: str | LogKey) -> None:
+        """
+        Encrypt and write the given list of LogEntry objects to disk,
+        replacing the file atomically so a crash can't lose the old log.
+        """
+        header = self._file_header()
+        if header is None:
+            header, aead = self._new_header(password)
+        else:
+            aead = self._unlock(password, header)
+        frames = [self._encrypt_frame(aead, header, e.to_dict()) for e in entries]
+        blob = header + b"".join(frames)
+        self._replace_file(blob)
+        self._frame_stats = (len(frames), 0)
+        self._frames_end = len(blob)
+
+    def _replace_file(self, blob: bytes) -> None:
+        """Write `blob` to a temp file next to the log, then rename it over."""
+        fd, tmp = tempfile.mkstemp(
+            dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(blob)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _complete_frames_end(self, fh) -> int:
+        """Offset just past the last complete frame in the open log file."""
+        size = os.fstat(fh.fileno()).st_size
+        if self._frames_end == size:
+            return size
+        pos = _HEADER_LEN
+        while True:
+            fh.seek(pos)
+            size_bytes = fh.read(_FRAME_LEN.size)
+            if len(size_bytes) < _FRAME_LEN.size:
+                return pos
+            (frame_size,) = _FRAME_LEN.unpack(size_bytes)
+            if pos + _FRAME_LEN.size + frame_size > size:
+                return pos
+            pos += _FRAME_LEN.size + frame_size
+
+    def _append_frame(self, aead: AESGCM, header: bytes, record: Dict[str, Any]) -> None:
+        frame = self._encrypt_frame(aead, header, record)
+        with self.path.open("r+b") as fh:
+            # Drop a partial frame left by an interrupted append; writing
+            # after it would make its length prefix swallow the new frame
+            end = self._complete_frames_end(fh)
+            fh.truncate(end)
+            fh.seek(end)
+            fh.write(frame)
+        self._frames_end = end + len(frame)
+
+    def append_log(self, entry: LogEntry, password: str | LogKey) -> None:
         """
-        Encrypt and write the given list of LogEntry objects to disk.
+        Append a new log entry as a single frame at the end of the file.
+
+        The password is checked against the header's verifier so a wrong
+        password can't write frames the rest of the log can't be read with.
         """
-        f = self._fernet(password)
-        raw = [e.to_dict() for e in entries]
-        data = json.dumps(raw, ensure_ascii=False, indent=2).encode("utf-8")
-        token = f.encrypt(data)
-        self.path.write_bytes(token)
+        header = self._file_header()
+        if header is None:
+            if self.path.exists():
+                # Legacy file: migrate with one full rewrite
+                logs = self.load_logs(password)
+                logs.append(entry)
+                self.save_logs(logs, password)
+            else:
+                self.save_logs([entry], password)
+            return
+
+        aead = self._unlock(password, header)
+        self._append_frame(aead, header, entry.to_dict())
+        if self._frame_stats is not None:
+            frames, tombstones = self._frame_stats
+            self._frame_stats = (frames + 1, tombstones)
 
-    def append_log(self, entry: LogEntry, password: str) -> None:
+    def delete_log(self, entry_id: str, password: str | LogKey) -> None:
         """
-        Append a new log entry and rewrite the encrypted log file.
+        Delete the entry with `entry_id` by appending a tombstone frame. The
+        file is compacted with a full rewrite once tombstones exceed
+        COMPACT_RATIO of its frames.
         """
-        logs = self.load_logs(password)
-        logs.append(entry)
-        self.save_logs(logs, password)
+        header = self._file_header()
+        if header is None:
+            # Missing or legacy file: plain rewrite
+            logs = self.load_logs(password)
+            kept = [e for e in logs if e.entry_id != entry_id]
+            if len(kept) != len(logs):
+                self.save_logs(kept, password)
+            return
+
+        aead = self._unlock(password, header)
+        self._append_frame(aead, header, {"deleted": entry_id})
+
+        if self._frame_stats is None:
+            return
+        frames, tombstones = self._frame_stats[0] + 1, self._frame_stats[1] + 1
+        self._frame_stats = (frames, tombstones)
+        if tombstones > frames * COMPACT_RATIO:
+            self.save_logs(self.load_logs(password), password)
 
     @staticmethod
     def create_entry(event_type: str, meta: Dict[str, Any], preview: str) -> LogEntry:
@@ -11,34 +11,60 @@ Menu options:
 from __future__ import annotations
 
 import datetime as _dt
-import json
+import functools
+import io
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
-from llm_client import LLMClient
-from prompts import EMAIL_SUMMARY_PROMPT, RESUME_TAILOR_PROMPT
-from email_fetcher import fetch_recent_messages
-from playwright_apply import apply_form_demo
+import orjson
+
+from llm_client import LLMClient, LLMError
+from email_summarizer import summarize_email_texts
+from prompts import resume_tailor_prompt
+from email_fetcher import iter_recent_messages
+from playwright_apply import ApplySession, apply_form_demo
 
 
 # ---------- Helpers ----------
 
 
+@functools.lru_cache(maxsize=1)
+def _get_client() -> LLMClient:
+    """Shared LLMClient, so its connection and response cache survive menu runs."""
+    return LLMClient()
+
+
 def _read_multiline(prompt: str) -> str:
     """
     Read multi-line input from the user until a line equal to 'END' is entered.
     """
     print(prompt)
     print("Paste your text below. When you're done, type 'END' on a new line and press Enter.")
-    lines: list[str] = []
+    sys.stdout.flush()
+    buf = io.StringIO()
+    readline = sys.stdin.readline
     while True:
-        try:
-            line = input()
-        except EOFError:
+        line = readline()
+        if not line:  # EOF
             break
         if line.strip() == "END":
             break
-        lines.append(line)
-    return "\n".join(lines).strip()
+        buf.write(line)
+    return buf.getvalue().strip()
+
+
+def _stream_to_stdout(chunks) -> str:
+    """
+    Print LLM output chunks as they arrive and return the full text.
+    """
+    parts: list[str] = []
+    for chunk in chunks:
+        sys.stdout.write(chunk)
+        sys.stdout.flush()
+        parts.append(chunk)
+    sys.stdout.write("\n")
+    return "".join(parts)
 
 
 def _save_artifact(prefix: str, content: str, ext: str = "txt") -> str:
@@ -62,32 +88,43 @@ def summarize_emails_demo(n: int = 3) -> None:
     """
     Fetch and summarize the most recent emails using the LLM.
     """
-    client = LLMClient()
+    client = _get_client()
     print(f"\n📨 Fetching and summarizing your {n} most recent emails...\n")
-    try:
-        msgs = fetch_recent_messages(n)
-    except Exception as e:
-        print("❌ Email demo failed:", e)
-        print("   Have you run `python email_fetcher.py --init-auth` first?")
-        return
-
-    if not msgs:
-        print("No messages found.")
-        return
 
-    for m in msgs:
-        prompt = EMAIL_SUMMARY_PROMPT.format(email=m["snippet"])
-        summary = client.generate(prompt, max_tokens=256)
-        print("\n---")
-        print(f"Subject: {m['subject']}")
-        print(summary)
+    # Pipeline: each chunk of messages is handed to the summarizer as soon as
+    # Gmail returns it, while later chunks are still being fetched. Snippets
+    # go out a few per call (JSON array reply), batches concurrently;
+    # unparseable batches fall back to one call per email.
+    pending = []
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        try:
+            for chunk in iter_recent_messages(n):
+                snippets = [m["snippet"] for m in chunk]
+                pending.append((chunk, pool.submit(summarize_email_texts, client, snippets)))
+        except Exception as e:
+            print("❌ Email demo failed:", e)
+            print("   Have you run `python email_fetcher.py --init-auth` first?")
+            return
+
+        if not pending:
+            print("No messages found.")
+            return
+
+        for chunk, future in pending:
+            for m, summary in zip(chunk, future.result()):
+                print("\n---")
+                print(f"Subject: {m['subject']}")
+                if isinstance(summary, LLMError):
+                    print(f"❌ Failed to summarize: {summary}")
+                else:
+                    print(summary)
 
 
 def tailor_resume_for_job() -> None:
     """
     Tailor a resume and cover letter to a job posting using the LLM.
     """
-    client = LLMClient()
+    client = _get_client()
 
     job_text = _read_multiline("\n🧾 Paste the job description.")
     if not job_text:
@@ -102,20 +139,25 @@ def tailor_resume_for_job() -> None:
         print("⚠️ No resume text provided. Aborting.")
         return
 
-    print("\n🤖 Generating tailored profile, bullets, and cover letter...")
-    prompt = RESUME_TAILOR_PROMPT.format(
-        job_text=job_text,
-        resume_text=resume_text,
-    )
-    raw_output = client.generate(prompt, max_tokens=1024, temperature=0.4)
+    print("\n🤖 Generating tailored profile, bullets, and cover letter...\n")
+    prompt = resume_tailor_prompt(job_text, resume_text)
+    # The raw JSON is shown as it streams in, then formatted below
+    raw_output = _stream_to_stdout(
+        client.generate_stream(
+            prompt,
+            max_tokens=1024,
+            temperature=0.0,
+            task_type="resume",
+            response_format={"type": "json_object"},
+        )
+    ).strip()
 
     # Try to parse JSON
     try:
-        data = json.loads(raw_output)
-    except json.JSONDecodeError:
-        print("\n⚠️ Could not parse JSON from model output. Here is the raw response:\n")
-        print(raw_output)
-        print("\nYou may need to copy/edit this manually.")
+        data = orjson.loads(raw_output)
+    except orjson.JSONDecodeError:
+        print("\n⚠️ Could not parse JSON from the model output above.")
+        print("You may need to copy/edit it manually.")
         return
 
     profile = data.get("profile", "")
@@ -133,7 +175,7 @@ def tailor_resume_for_job() -> None:
     print(cover_letter)
 
     # Save JSON artifact
-    pretty_json = json.dumps(data, indent=2, ensure_ascii=False)
+    pretty_json = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
     path = _save_artifact("tailored_resume", pretty_json, ext="json")
     print(f"\n💾 Saved tailored resume+cover letter JSON to: {path}")
 
@@ -164,13 +206,15 @@ def run_playwright_demo() -> None:
     auto_submit = auto_submit_str in ("y", "yes")
 
     print("\nLaunching browser...")
-    apply_form_demo(
-        url=url,
-        resume_path=resume_path,
-        applicant_name=name,
-        applicant_email=email,
-        auto_submit=auto_submit,
-    )
+    with ApplySession() as session:
+        apply_form_demo(
+            url=url,
+            resume_path=resume_path,
+            applicant_name=name,
+            applicant_email=email,
+            auto_submit=auto_submit,
+            session=session,
+        )
 
 
 # ---------- CLI Menu ----------
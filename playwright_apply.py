@@ -8,8 +8,76 @@ each site's Terms of Service.
 """
 from typing import Optional
 
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+# Fills every [selector, value] pair in one round-trip. Uses the native value
+# setter and fires input/change so framework-controlled inputs (React etc.)
+# see the change, like page.fill would. Returns the selectors it filled.
+_FILL_FIELDS_JS = """
+(pairs) => {
+  const setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, "value").set;
+  const filled = [];
+  for (const [sel, val] of pairs) {
+    const el = document.querySelector(sel);
+    if (!el || el.disabled || el.readOnly) continue;
+    el.focus();
+    setValue.call(el, val);
+    el.dispatchEvent(new Event("input", { bubbles: true }));
+    el.dispatchEvent(new Event("change", { bubbles: true }));
+    filled.push(sel);
+  }
+  return filled;
+}
+"""
+
+
+class ApplySession:
+    """
+    One Playwright driver, Chromium process and browser context shared by
+    several apply runs, so only the first run pays the browser start-up.
+
+        with ApplySession() as session:
+            apply_form_demo(url, ..., session=session)
+            apply_form_demo(other_url, ..., session=session)
+    """
+
+    def __init__(self, headless: bool = False):
+        self.headless = headless
+        self._playwright = None
+        self.browser = None
+        self.context = None
+
+    def start(self) -> "ApplySession":
+        # Chromium may have crashed or been quit by the user since the last
+        # run; tear the dead session down and launch a fresh browser.
+        if self._playwright is not None and not self.browser.is_connected():
+            self.close()
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+            self.browser = self._playwright.chromium.launch(headless=self.headless)
+            self.context = self.browser.new_context()
+        return self
+
+    def new_page(self):
+        return self.start().context.new_page()
+
+    def close(self) -> None:
+        if self._playwright is None:
+            return
+        try:
+            if self.browser.is_connected():
+                self.browser.close()
+        finally:
+            self._playwright.stop()
+            self._playwright = self.browser = self.context = None
+
+    def __enter__(self) -> "ApplySession":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
 
 def apply_form_demo(
     url: str,
@@ -17,6 +85,7 @@ def apply_form_demo(
     applicant_name: str,
     applicant_email: str,
     auto_submit: bool = False,
+    session: Optional[ApplySession] = None,
 ) -> None:
     """
     Open a browser and attempt to fill an application-like form.
@@ -27,13 +96,35 @@ def apply_form_demo(
         applicant_name: Your full name.
         applicant_email: Your email address.
         auto_submit: If True, click the detected submit button automatically.
+        session: Browser session to open the form in. Without one, a browser
+            is launched for this call and closed at the end.
     """
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
+    args = (url, resume_path, applicant_name, applicant_email, auto_submit)
+    if session is None:
+        with ApplySession() as own_session:
+            _apply_form(own_session, *args)
+        return
+    _apply_form(session, *args)
 
+
+def _apply_form(
+    session: ApplySession,
+    url: str,
+    resume_path: str,
+    applicant_name: str,
+    applicant_email: str,
+    auto_submit: bool,
+) -> None:
+    page = session.new_page()
+    try:
         print(f"🌐 Navigating to: {url}")
-        page.goto(url, timeout=30000)
+        # Don't wait for every image/font ("load"); continue as soon as the
+        # DOM is parsed and a form field has actually rendered.
+        page.goto(url, timeout=30000, wait_until="domcontentloaded")
+        try:
+            page.wait_for_selector("input", state="attached", timeout=10000)
+        except PlaywrightTimeoutError:
+            print("  ℹ️ No input fields appeared within 10s; trying anyway.")
 
         # Heuristic attempts to fill common name/email fields
         selectors = [
@@ -45,24 +136,24 @@ def apply_form_demo(
             ('input[type="email"]', applicant_email),
         ]
 
-        for sel, val in selectors:
-            try:
-                input_el = page.query_selector(sel)
-                if input_el:
-                    page.fill(sel, val)
-                    print(f"  ✓ Filled {sel!r} with {val!r}")
-            except Exception:
-                # Ignore individual selector failures; keep going.
-                pass
+        # One page.evaluate for all fields instead of a query_selector + fill
+        # round-trip per selector; missing selectors are simply skipped.
+        values = dict(selectors)
+        try:
+            filled = page.evaluate(_FILL_FIELDS_JS, [list(pair) for pair in selectors])
+        except Exception as e:
+            print(f"  ⚠️ Failed to fill fields: {e}")
+            filled = []
+        for sel in filled:
+            print(f"  ✓ Filled {sel!r} with {values[sel]!r}")
 
-        # Attempt to set file input for resume upload
+        # Attempt to set file input for resume upload. Acting on the selector
+        # directly (short timeout) saves a query_selector round-trip.
         try:
-            file_input = page.query_selector('input[type="file"]')
-            if file_input:
-                file_input.set_input_files(resume_path)
-                print(f"  ✓ Attached resume file: {resume_path}")
-            else:
-                print("  ℹ️ No file input found on page.")
+            page.set_input_files('input[type="file"]', resume_path, timeout=500)
+            print(f"  ✓ Attached resume file: {resume_path}")
+        except PlaywrightTimeoutError:
+            print("  ℹ️ No file input found on page.")
         except Exception as e:
             print(f"  ⚠️ Failed to attach file: {e}")
 
@@ -72,22 +163,26 @@ def apply_form_demo(
                 input("Press Enter to attempt submit (or Ctrl+C to abort)... ")
             except KeyboardInterrupt:
                 print("\n🚫 Submission aborted by user.")
-                browser.close()
                 return
 
         # Try to click the submit button
         try:
-            submit_button = page.query_selector('button[type="submit"]')
-            if submit_button:
-                submit_button.click()
-                print("  ✅ Clicked submit button (best-effort).")
-            else:
-                print("  ℹ️ No submit button auto-detected. Submit manually in the browser.")
+            page.click('button[type="submit"]', timeout=1000)
+        except PlaywrightTimeoutError:
+            print("  ℹ️ No submit button auto-detected. Submit manually in the browser.")
         except Exception as e:
             print(f"  ⚠️ Submit failed: {e}")
+        else:
+            # Let the submission's requests finish before closing the page
+            try:
+                page.wait_for_load_state("networkidle", timeout=5000)
+            except PlaywrightTimeoutError:
+                pass
+            print("  ✅ Clicked submit button (best-effort).")
 
-        print("✅ Playwright demo finished. You can now close the browser.")
-        browser.close()
+        print("✅ Playwright demo finished.")
+    finally:
+        page.close()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 # prompts.py
 """
-Prompt templates for the local agent.
+Prompt templates for the local agent, and helpers to fill them in and parse
+their replies.
 """
+from typing import List, Optional, Sequence
+
+import orjson
 
 
 EMAIL_SUMMARY_PROMPT = """
@@ -22,6 +26,26 @@ Result:
 """.strip()
 
 
+EMAIL_SUMMARY_BATCH_PROMPT = """
+You are a helpful assistant. For EACH email below, write a 2-sentence summary
+and list up to 3 action items (short bullet points).
+
+Return your answer as VALID JSON ONLY: an array with one object per email,
+in the same order, using the email's number as "i":
+
+[
+  {"i": 0, "summary": "<two-sentence summary>", "actions": ["<action 1>", "<action 2>"]}
+]
+
+Important:
+- Use an empty "actions" list when there is nothing to do.
+- Do NOT include any text before or after the JSON.
+
+Emails:
+{emails}
+""".strip()
+
+
 RESUME_TAILOR_PROMPT = """
 You are an expert resume and cover letter writer.
 
@@ -60,3 +84,80 @@ Job Posting:
 Resume:
 {resume_text}
 """.strip()
+
+
+def _split_template(template: str, *fields: str) -> tuple[str, ...]:
+    """
+    Split `template` around each `{field}` placeholder (in order), once at
+    import time, so filling a prompt is plain concatenation instead of a
+    str.format parse. It also leaves the literal JSON braces alone.
+    """
+    parts = []
+    rest = template
+    for field in fields:
+        head, rest = rest.split("{" + field + "}", 1)
+        parts.append(head)
+    parts.append(rest)
+    return tuple(parts)
+
+
+_EMAIL_SUMMARY_PARTS = _split_template(EMAIL_SUMMARY_PROMPT, "email")
+_EMAIL_SUMMARY_BATCH_PARTS = _split_template(EMAIL_SUMMARY_BATCH_PROMPT, "emails")
+_RESUME_TAILOR_PARTS = _split_template(RESUME_TAILOR_PROMPT, "job_text", "resume_text")
+
+
+def email_summary_prompt(email: str) -> str:
+    """Return EMAIL_SUMMARY_PROMPT with the email text filled in."""
+    head, tail = _EMAIL_SUMMARY_PARTS
+    return head + email + tail
+
+
+def resume_tailor_prompt(job_text: str, resume_text: str) -> str:
+    """Return RESUME_TAILOR_PROMPT with the job posting and resume filled in."""
+    head, middle, tail = _RESUME_TAILOR_PARTS
+    return "".join((head, job_text, middle, resume_text, tail))
+
+
+def email_summary_batch_prompt(emails: Sequence[str]) -> str:
+    """Return EMAIL_SUMMARY_BATCH_PROMPT with the emails numbered from 0."""
+    head, tail = _EMAIL_SUMMARY_BATCH_PARTS
+    numbered = "\n\n".join(f"[{i}]\n{email}" for i, email in enumerate(emails))
+    return head + numbered + tail
+
+
+def parse_email_summary_batch(raw_output: str, count: int) -> Optional[List[str]]:
+    """
+    Parse a reply to EMAIL_SUMMARY_BATCH_PROMPT into one summary text per
+    email, laid out like a single EMAIL_SUMMARY_PROMPT result.
+
+    Returns None if the reply isn't valid JSON or misses any of the emails.
+    """
+    try:
+        items = orjson.loads(raw_output)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    out: List[Optional[str]] = [None] * count
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        i = item.get("i")
+        # bool is an int subclass; "i": true must not stand for email 1
+        if not isinstance(i, int) or isinstance(i, bool) or not 0 <= i < count:
+            continue
+        actions = item.get("actions") or ["None"]
+        # Small models often send a bare string ("None") instead of a list
+        if isinstance(actions, str):
+            actions = [actions]
+        elif not isinstance(actions, list):
+            return None
+        out[i] = (
+            f"1) Summary:\n- {str(item.get('summary', '')).strip()}\n\n2) Actions:\n"
+            + "\n".join(f"- {a}" for a in actions)
+        )
+
+    if any(o is None for o in out):
+        return None
+    return out  # type: ignore[return-value]
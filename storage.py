@@ -4,42 +4,168 @@ Secure token storage wrapper:
 - Primary: python-keyring
 - Fallback: encrypted local file using cryptography.
 
-For production, you should use a stronger KDF (PBKDF2/scrypt) and harden
-passphrase handling. This file is intentionally minimal for a local demo.
+The fallback file is `MAGIC | 16-byte salt | 12-byte nonce | AES-256-GCM
+ciphertext+tag` (the header is authenticated as associated data). The key is
+derived from the passphrase with scrypt and the cipher cached in memory, so
+the (deliberately slow) KDF runs once per passphrase. Files written by older
+versions (Fernet, with or without the salt header) are still readable.
 """
-import json
+import functools
+import hashlib
+import io
 import os
 from pathlib import Path
 import base64
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional, Tuple
 
-try:
-    import keyring  # type: ignore
-    _KEYRING_AVAILABLE = True
-except Exception:
-    _KEYRING_AVAILABLE = False
+import orjson
 
-from cryptography.fernet import Fernet
+# keyring and cryptography are imported on first use, so importing this
+# module stays cheap for code paths that never touch tokens
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
-FALLBACK_FILE = Path.home() / ".local_agent_tokens.json"
+_MAGIC = b"LATOK2"
+# Header of the previous format: same layout, followed by a Fernet token
+_FERNET_MAGIC = b"LATOK1"
+_SALT_LEN = 16
+_NONCE_LEN = 12
+_HEADER_LEN = len(_MAGIC) + _SALT_LEN
 
 
-def _derive_key_from_password(password: str) -> bytes:
+@functools.lru_cache(maxsize=1)
+def _fallback_file() -> Path:
+    """Encrypted token file used when keyring is unavailable."""
+    return Path.home() / ".local_agent_tokens.json"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_keyring():
+    """
+    Import keyring on first use (it is slow to import and load its backend),
+    or return None if it isn't usable.
+    """
+    try:
+        import keyring  # type: ignore
+    except Exception:
+        return None
+    return keyring
+
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+    """Derive a raw 32-byte key from the passphrase with scrypt."""
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=2**14, r=8, p=1, dklen=32
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _aead(password: str, salt: bytes) -> "AESGCM":
+    """AES-GCM cipher keyed with scrypt(password, salt), built once per pair."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    return AESGCM(_derive_key(password, salt))
+
+
+@functools.lru_cache(maxsize=4)
+def _fernet(password: str, salt: bytes) -> "Fernet":
+    """Cipher for salted Fernet token files (the format before AES-GCM)."""
+    from cryptography.fernet import Fernet
+
+    return Fernet(base64.urlsafe_b64encode(_derive_key(password, salt)))
+
+
+@functools.lru_cache(maxsize=4)
+def _legacy_fernet(password: str) -> "Fernet":
+    """Cipher for token files written before the scrypt header existed."""
+    from cryptography.fernet import Fernet
+
+    return Fernet(base64.urlsafe_b64encode(password.encode("utf-8").ljust(32, b"0")[:32]))
+
+
+def _fallback_salt() -> bytes:
+    """Salt of the existing fallback file, or a fresh one."""
+    try:
+        with _fallback_file().open("rb") as fh:
+            header = fh.read(_HEADER_LEN)
+    except FileNotFoundError:
+        header = b""
+    if len(header) == _HEADER_LEN and header[:len(_MAGIC)] in (_MAGIC, _FERNET_MAGIC):
+        return header[len(_MAGIC):]
+    return os.urandom(_SALT_LEN)
+
+
+def _write_fallback_file(data: bytes) -> os.stat_result:
+    """
+    Replace the fallback file's contents with `data` and fsync it, so a crash
+    right after set() can't leave a truncated token file. The file is created
+    owner-only. Returns the file's stat after the write.
+    """
+    fd = os.open(_fallback_file(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+        return os.fstat(fd)
+    finally:
+        os.close(fd)
+
+
+def _decrypt_fallback(blob: bytes, password: str) -> bytes:
     """
-    Very simple KDF (NOT for production use).
-    Derives a 32-byte key from the password and encodes as urlsafe base64.
+    Decrypt the contents of the fallback file, in the current or an older
+    format. Raises ValueError if the password is wrong or the file corrupted.
     """
-    return base64.urlsafe_b64encode(password.encode("utf-8").ljust(32, b"0")[:32])
+    from cryptography.exceptions import InvalidTag
+    from cryptography.fernet import InvalidToken
+
+    header = blob[:_HEADER_LEN]
+    salt = header[len(_MAGIC):]
+    try:
+        if header.startswith(_MAGIC):
+            body = blob[_HEADER_LEN:]
+            return _aead(password, salt).decrypt(
+                body[:_NONCE_LEN], body[_NONCE_LEN:], header
+            )
+        if header.startswith(_FERNET_MAGIC):
+            return _fernet(password, salt).decrypt(blob[_HEADER_LEN:])
+        return _legacy_fernet(password).decrypt(blob)
+    except (InvalidTag, InvalidToken, ValueError) as e:
+        raise ValueError("Incorrect password or corrupted token file.") from e
+
+
+def _file_version(st: os.stat_result, password: str) -> Tuple[int, int, str]:
+    """Cache version of the fallback file as read with `password`."""
+    return (
+        st.st_mtime_ns,
+        st.st_size,
+        hashlib.sha256(password.encode("utf-8")).hexdigest(),
+    )
 
 
 class TokenStore:
     def __init__(self, key_name: str = "local_agent_token"):
         self.key_name = key_name
+        # (version, data) from the last get()/set(). The version is the raw
+        # keyring payload, or (mtime_ns, size, sha256(password)) of the
+        # fallback file, so get() only decrypts/parses after a change.
+        self._cache: Optional[Tuple[Any, dict]] = None
+
+    def _cached(self, version: Any) -> Optional[dict]:
+        if self._cache is not None and self._cache[0] == version:
+            return dict(self._cache[1])
+        return None
 
     def set(self, data: dict, fallback_password: Optional[str] = None) -> bool:
-        payload = json.dumps(data)
-        if _KEYRING_AVAILABLE:
-            keyring.set_password("local_agent", self.key_name, payload)
+        payload = orjson.dumps(data)
+        self._cache = None
+        keyring = _get_keyring()
+        if keyring is not None:
+            text = payload.decode("utf-8")
+            keyring.set_password("local_agent", self.key_name, text)
+            self._cache = (text, dict(data))
             return True
 
         # Fallback to encrypted file
@@ -47,36 +173,54 @@ class TokenStore:
             raise RuntimeError(
                 "Keyring not available. Provide a fallback password to encrypt tokens."
             )
-        key = _derive_key_from_password(fallback_password)
-        f = Fernet(key)
-        token = f.encrypt(payload.encode("utf-8"))
-        FALLBACK_FILE.write_bytes(token)
+        header = _MAGIC + _fallback_salt()
+        nonce = os.urandom(_NONCE_LEN)
+        ciphertext = _aead(fallback_password, header[len(_MAGIC):]).encrypt(
+            nonce, payload, header
+        )
+        st = _write_fallback_file(header + nonce + ciphertext)
+        self._cache = (_file_version(st, fallback_password), dict(data))
         return True
 
     def get(self, fallback_password: Optional[str] = None) -> Optional[dict]:
-        if _KEYRING_AVAILABLE:
+        keyring = _get_keyring()
+        if keyring is not None:
             payload = keyring.get_password("local_agent", self.key_name)
             if not payload:
                 return None
-            return json.loads(payload)
+            cached = self._cached(payload)
+            if cached is not None:
+                return cached
+            data = orjson.loads(payload)
+            self._cache = (payload, data)
+            return dict(data)
 
-        if not FALLBACK_FILE.exists():
+        try:
+            st = _fallback_file().stat()
+        except FileNotFoundError:
             return None
         if not fallback_password:
             raise RuntimeError(
                 "Keyring not available. Provide fallback password to decrypt tokens."
             )
-        key = _derive_key_from_password(fallback_password)
-        f = Fernet(key)
-        token = FALLBACK_FILE.read_bytes()
-        payload = f.decrypt(token)
-        return json.loads(payload.decode("utf-8"))
+        version = _file_version(st, fallback_password)
+        cached = self._cached(version)
+        if cached is not None:
+            return cached
+        with _fallback_file().open("rb", buffering=io.DEFAULT_BUFFER_SIZE) as fh:
+            blob = fh.read()
+        payload = _decrypt_fallback(blob, fallback_password)
+        data = orjson.loads(payload)
+        self._cache = (version, data)
+        return dict(data)
 
     def delete(self) -> None:
-        if _KEYRING_AVAILABLE:
+        self._cache = None
+        keyring = _get_keyring()
+        if keyring is not None:
             keyring.delete_password("local_agent", self.key_name)
         else:
             try:
-                FALLBACK_FILE.unlink()
+                _fallback_file().unlink()
             except FileNotFoundError:
                 pass
@@ -2,27 +2,68 @@
 """
 Small utilities for environment variables and credential paths.
 """
+import functools
 import os
+import threading
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-load_dotenv()
+
+@functools.lru_cache(maxsize=1)
+def load_env() -> None:
+    """
+    Load `.env` into os.environ. Every module that needs it calls this, so
+    the file is parsed once per process no matter how many import it.
+    Nothing is loaded at import time: env() and get_credentials_path()
+    call this on first use.
+    """
+    load_dotenv()
 
 
+@functools.lru_cache(maxsize=None)
 def env(name: str, default=None):
-    """Get an environment variable with an optional default."""
-    return os.getenv(name, default)
+    """
+    Get an environment variable with an optional default. Lookups are
+    memoized per (name, default); call clear_env_cache() after changing
+    os.environ at runtime.
+    """
+    load_env()
+    return os.environ.get(name, default)
+
+
+# Only a found path is memoized, so a credentials file added while the
+# process runs is picked up on the next call
+_credentials_path: str | None = None
+_credentials_lock = threading.Lock()
 
 
 def get_credentials_path() -> str | None:
     """
     Return the path to the Google OAuth credentials file if it exists,
-    otherwise return None.
+    otherwise return None. Once found, the path is resolved (and stat'ed)
+    only once per process.
     """
+    global _credentials_path
+    if _credentials_path is None:
+        with _credentials_lock:
+            if _credentials_path is None:
+                _credentials_path = _find_credentials_path()
+    return _credentials_path
+
+
+def _find_credentials_path() -> str | None:
     p = env("GOOGLE_OAUTH_CREDENTIALS")
     if p:
         ps = Path(p)
         if ps.exists():
             return str(ps)
     return None
+
+
+def clear_env_cache() -> None:
+    """Forget memoized env() values and the resolved credentials path."""
+    global _credentials_path
+    env.cache_clear()
+    with _credentials_lock:
+        _credentials_path = None
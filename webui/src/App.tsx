@@ -14,7 +14,7 @@ type ResumeResult = {
 };
 
 type LogEntry = {
-  id: number;
+  id: string;
   timestamp: string;
   event_type: string;
   meta: any;
@@ -231,7 +231,7 @@ const LogsView: React.FC = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [typeFilter, startDate, endDate]);
 
-  const deleteLog = async (id: number) => {
+  const deleteLog = async (id: string) => {
     if (!window.confirm("Delete this log entry?")) return;
     setLoading(true);
     setError(null);
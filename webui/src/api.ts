@@ -4,6 +4,7 @@ export const API_BASE = "http://localhost:8000/api";
 export async function postJSON(path: string, body: any) {
   const res = await fetch(`${API_BASE}${path}`, {
     method: "POST",
+    credentials: "include",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(body ?? {})
   });
@@ -16,7 +17,8 @@ export async function postJSON(path: string, body: any) {
 
 export async function getJSON(path: string) {
   const res = await fetch(`${API_BASE}${path}`, {
-    method: "GET"
+    method: "GET",
+    credentials: "include"
   });
   const data = await res.json().catch(() => ({}));
   if (!res.ok) {